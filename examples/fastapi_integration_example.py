@@ -3,29 +3,60 @@ FastAPI 集成示例
 展示如何在 FastAPI 项目中集成 Rust 聊天服务
 """
 
-from fastapi import FastAPI, HTTPException, Query
-from pydantic import BaseModel
-from typing import Optional, List
-from python_client_example import RustChatClient
+import asyncio
+import os
+import re
+from contextlib import asynccontextmanager
+
+import aiohttp
+import msgspec
+import orjson
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, TypeAdapter
+from typing import AsyncIterator, List, Literal, Optional
+from typing_extensions import TypedDict
+from python_client_example import AsyncRustChatClient
+
+RUST_SERVICE_URL = "http://127.0.0.1:8081"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用生命周期：整个进程共享一个 aiohttp.ClientSession（keep-alive 连接池）"""
+    session = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=100, limit_per_host=50, ttl_dns_cache=300),
+        timeout=aiohttp.ClientTimeout(total=10)
+    )
+    # 初始化 Rust 聊天服务客户端
+    app.state.rust_client = AsyncRustChatClient(
+        base_url=RUST_SERVICE_URL,
+        auth_secret="sso-secret",  # 与 Rust 服务的 AUTH_SECRET 保持一致
+        session=session
+    )
+    yield
+    await session.close()
 
-app = FastAPI(title="Python FastAPI + Rust Chat Service")
 
-# 初始化 Rust 聊天服务客户端
-rust_client = RustChatClient(
-    base_url="http://127.0.0.1:8081",
-    auth_secret="sso-secret"  # 与 Rust 服务的 AUTH_SECRET 保持一致
+# 响应默认走 orjson 序列化（评论树这类大嵌套列表比标准库 json 快得多）
+app = FastAPI(
+    title="Python FastAPI + Rust Chat Service",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 
 # ==================== 数据模型 ====================
 
-class MessageRequest(BaseModel):
+# 只做透传的请求体使用 msgspec.Struct，解码与校验比 Pydantic 模型快一个数量级
+class MessageRequest(msgspec.Struct):
     room_id: str
     username: str
     content: str
 
 
-class CommentRequest(BaseModel):
+class CommentRequest(msgspec.Struct):
     post_id: int
     author_id: int
     content: str
@@ -33,7 +64,7 @@ class CommentRequest(BaseModel):
     at_user_id: Optional[int] = None
 
 
-class ReactionRequest(BaseModel):
+class ReactionRequest(msgspec.Struct):
     resource_type: int  # 1=post, 2=comment
     resource_id: int
     reactor_id: int
@@ -41,10 +72,77 @@ class ReactionRequest(BaseModel):
 
 
 class SocialActionRequest(BaseModel):
-    action: str  # follow | unfollow | block | unblock | mute | unmute
+    # Literal 走 pydantic-core 的字面量快速校验，非法操作直接 422，不再发起 RPC
+    action: Literal["follow", "unfollow", "block", "unblock", "mute", "unmute"]
     target: str
 
 
+# 评论树输出结构与 Rust 端 CommentWithReplies / CommentReply 一致
+# （Python < 3.12 上 pydantic 要求使用 typing_extensions.TypedDict）
+class ReplyOut(TypedDict):
+    id: int
+    author_id: int
+    content: str
+    at_user_id: Optional[int]
+    created_at: str
+
+
+class CommentOut(TypedDict):
+    id: int
+    post_id: int
+    author_id: int
+    content: str
+    at_user_id: Optional[int]
+    created_at: str
+    replies: List[ReplyOut]
+
+
+# 模块加载时构建一次序列化器，请求路径上不再重复构造 pydantic-core schema
+_comment_adapter = TypeAdapter(CommentOut)
+
+
+def _msgspec_error(message: str) -> dict:
+    """把 msgspec 的校验错误信息转成 FastAPI / Pydantic 的错误条目（loc 以 body 开头）
+    
+    msgspec 的信息形如 "Expected `int`, got `str` - at `$.post_id`"，路径在末尾
+    """
+    msg, sep, path = message.partition(" - at `")
+    loc = ["body"]
+    if sep:
+        for name, index in re.findall(r"\.([^.\[`]+)|\[(\d+)\]", path):
+            loc.append(name if name else int(index))
+    missing = re.match(r"Object missing required field `(.+)`$", msg)
+    if missing:
+        return {"type": "missing", "loc": tuple(loc) + (missing.group(1),), "msg": "Field required", "input": None}
+    return {"type": "value_error", "loc": tuple(loc), "msg": msg, "input": None}
+
+
+def msgspec_body(model: type):
+    """生成 FastAPI 依赖：用 msgspec 直接解码原始请求体为指定 Struct
+    
+    解码或校验失败时抛出 RequestValidationError，由 FastAPI 返回与 Pydantic 模型相同的 422 detail 结构；
+    msgspec 按声明类型严格校验，不做 "123" → 123 这类宽松转换
+    """
+    async def parse(request: Request):
+        try:
+            return msgspec.json.decode(await request.body(), type=model)
+        except msgspec.ValidationError as e:
+            raise RequestValidationError([_msgspec_error(str(e))])
+        except msgspec.DecodeError as e:
+            raise RequestValidationError([{
+                "type": "json_invalid", "loc": ("body",), "msg": "JSON decode error",
+                "input": {}, "ctx": {"error": str(e)},
+            }])
+    return parse
+
+
+def msgspec_openapi(model: type) -> dict:
+    """端点的 openapi_extra：把 Struct 的 JSON Schema 发布为请求体，/docs 与 openapi.json 照常展示"""
+    _, components = msgspec.json.schema_components([model], ref_template="#/components/schemas/{name}")
+    schema = components[model.__name__]
+    return {"requestBody": {"required": True, "content": {"application/json": {"schema": schema}}}}
+
+
 # ==================== API 端点 ====================
 
 @app.get("/")
@@ -53,14 +151,14 @@ async def root():
     return {
         "service": "Python FastAPI + Rust Chat Service",
         "status": "running",
-        "rust_service": rust_client.base_url
+        "rust_service": app.state.rust_client.base_url
     }
 
 
-@app.post("/api/messages/send")
-async def send_message(request: MessageRequest):
+@app.post("/api/messages/send", openapi_extra=msgspec_openapi(MessageRequest))
+async def send_message(request: MessageRequest = Depends(msgspec_body(MessageRequest))):
     """发送消息到聊天室"""
-    success = rust_client.publish_message(
+    success = await app.state.rust_client.publish_message(
         request.room_id,
         request.username,
         request.content
@@ -73,26 +171,26 @@ async def send_message(request: MessageRequest):
 @app.get("/api/rooms/{room_id}/users")
 async def get_room_users(room_id: str):
     """获取房间用户列表"""
-    users = rust_client.get_room_users(room_id)
+    users = await app.state.rust_client.get_room_users(room_id)
     return {"status": "ok", "users": users}
 
 
 @app.get("/api/rooms/{room_id}/search")
 async def search_room_users(room_id: str, q: str = Query(..., description="搜索关键字")):
     """搜索房间用户"""
-    users = rust_client.search_users(room_id, q)
+    users = await app.state.rust_client.search_users(room_id, q)
     return {"status": "ok", "users": users}
 
 
-@app.post("/api/comments/create")
-async def create_comment(request: CommentRequest):
+@app.post("/api/comments/create", openapi_extra=msgspec_openapi(CommentRequest))
+async def create_comment(request: CommentRequest = Depends(msgspec_body(CommentRequest))):
     """创建评论
     
     - 一级评论：parent_comment_id 为 None
     - 二级回复：parent_comment_id 为父评论的 ID
     - 可选 @某人：设置 at_user_id
     """
-    comment = rust_client.create_comment(
+    comment = await app.state.rust_client.create_comment(
         post_id=request.post_id,
         author_id=request.author_id,
         content=request.content,
@@ -114,7 +212,7 @@ async def check_post_status(post_id: int):
     - locked: 帖子是否已锁定
     - message: 状态描述
     """
-    status = rust_client.check_post_status(post_id)
+    status = await app.state.rust_client.check_post_status(post_id)
     
     # 根据状态返回不同的 HTTP 状态码
     if not status.get('exists'):
@@ -143,24 +241,54 @@ async def get_post_comments(post_id: int):
         }
     ]
     """
-    # 先检查帖子状态
-    status = rust_client.check_post_status(post_id)
+    client = app.state.rust_client
+    
+    # 状态检查与评论流的首条数据并行拉取，总耗时取两者较大值而非两者之和
+    comments = client.aiter_comments(post_id)
+    first_task = asyncio.create_task(anext(comments, None))
+    try:
+        status = await client.check_post_status(post_id)
+    except BaseException:
+        await _discard_stream(first_task, comments)
+        raise
     
     if not status.get('exists'):
+        await _discard_stream(first_task, comments)
         raise HTTPException(status_code=404, detail="帖子不存在")
     
     if status.get('deleted'):
+        await _discard_stream(first_task, comments)
         raise HTTPException(status_code=410, detail="帖子已被删除")
     
-    # 帖子正常，获取评论
-    comments = rust_client.get_comments(post_id)
-    return {"status": "ok", "comments": comments, "post_locked": status.get('locked', False)}
+    # 帖子正常，逐条序列化评论并流式返回，客户端无需等待整棵评论树
+    first = await first_task
+    return StreamingResponse(
+        _stream_comments(first, comments, status.get('locked', False)),
+        media_type="application/json"
+    )
+
+
+async def _discard_stream(first_task: asyncio.Task, comments: AsyncIterator[dict]):
+    """取消预取任务并关闭上游评论流（必须等任务结束后才能 aclose 生成器）"""
+    first_task.cancel()
+    await asyncio.gather(first_task, return_exceptions=True)
+    await comments.aclose()
+
+
+async def _stream_comments(first: Optional[dict], rest: AsyncIterator[dict], locked: bool):
+    """把评论流编码为 {"status": "ok", "post_locked": ..., "comments": [...]}"""
+    yield b'{"status":"ok","post_locked":' + orjson.dumps(locked) + b',"comments":['
+    if first is not None:
+        yield _comment_adapter.dump_json(first)
+        async for comment in rest:
+            yield b',' + _comment_adapter.dump_json(comment)
+    yield b']}'
 
 
 @app.delete("/api/posts/{post_id}")
 async def delete_post(post_id: int):
     """删除帖子（软删除，级联删除所有评论和反应）"""
-    success = rust_client.delete_post(post_id)
+    success = await app.state.rust_client.delete_post(post_id)
     if not success:
         raise HTTPException(status_code=500, detail="Failed to delete post")
     return {"status": "ok", "message": "Post and all comments deleted successfully"}
@@ -173,16 +301,16 @@ async def delete_comment(comment_id: int):
     - 如果是一级评论，会级联删除其下的所有二级回复
     - 如果是二级回复，只删除该回复本身
     """
-    success = rust_client.delete_comment(comment_id)
+    success = await app.state.rust_client.delete_comment(comment_id)
     if not success:
         raise HTTPException(status_code=500, detail="Failed to delete comment")
     return {"status": "ok", "message": "Comment deleted successfully"}
 
 
-@app.post("/api/reactions/add")
-async def add_reaction(request: ReactionRequest):
+@app.post("/api/reactions/add", openapi_extra=msgspec_openapi(ReactionRequest))
+async def add_reaction(request: ReactionRequest = Depends(msgspec_body(ReactionRequest))):
     """添加反应（点赞/收藏）"""
-    success = rust_client.add_reaction(
+    success = await app.state.rust_client.add_reaction(
         resource_type=request.resource_type,
         resource_id=request.resource_id,
         reactor_id=request.reactor_id,
@@ -196,7 +324,7 @@ async def add_reaction(request: ReactionRequest):
 @app.post("/api/social/action")
 async def social_action(request: SocialActionRequest):
     """执行社交操作"""
-    success = rust_client.social_action(request.action, request.target)
+    success = await app.state.rust_client.social_action(request.action, request.target)
     if not success:
         raise HTTPException(status_code=500, detail="Failed to perform social action")
     return {"status": "ok", "message": f"Action '{request.action}' performed successfully"}
@@ -207,7 +335,7 @@ async def social_action(request: SocialActionRequest):
 @app.post("/api/posts/{post_id}/like")
 async def like_post(post_id: int, user_id: int):
     """点赞帖子（业务封装）"""
-    success = rust_client.add_reaction(
+    success = await app.state.rust_client.add_reaction(
         resource_type=1,  # 1=post
         resource_id=post_id,
         reactor_id=user_id,
@@ -221,7 +349,7 @@ async def like_post(post_id: int, user_id: int):
 @app.post("/api/comments/{comment_id}/like")
 async def like_comment(comment_id: int, user_id: int):
     """点赞评论（业务封装）"""
-    success = rust_client.add_reaction(
+    success = await app.state.rust_client.add_reaction(
         resource_type=2,  # 2=comment
         resource_id=comment_id,
         reactor_id=user_id,
@@ -250,7 +378,7 @@ async def reply_to_post(
     # 这里简化处理，实际应该从数据库获取帖子作者ID
     at_user_id = None  # 如果 at_author=True，这里应该设置为帖子作者的ID
     
-    comment = rust_client.create_comment(
+    comment = await app.state.rust_client.create_comment(
         post_id=post_id,
         author_id=author_id,
         content=content,
@@ -279,7 +407,7 @@ async def reply_to_comment(
         content: 回复内容
         at_comment_author_id: @被回复评论的作者ID
     """
-    comment = rust_client.create_comment(
+    comment = await app.state.rust_client.create_comment(
         post_id=post_id,
         author_id=author_id,
         content=content,
@@ -303,9 +431,18 @@ if __name__ == "__main__":
     print("1. 确保 Rust 聊天服务已启动（http://127.0.0.1:8081）")
     print("2. 运行此 FastAPI 服务：")
     print("   uvicorn fastapi_integration_example:app --reload --port 8000")
+    print("   （生产环境：--loop uvloop --http httptools --workers N）")
     print("\n访问地址：")
     print("- API 文档: http://127.0.0.1:8000/docs")
     print("- ReDoc: http://127.0.0.1:8000/redoc")
     print("=" * 60)
     
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # uvloop + httptools 替换默认事件循环和 HTTP 解析器；多 worker 需要以导入字符串形式传入 app
+    uvicorn.run(
+        "fastapi_integration_example:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="uvloop",
+        http="httptools",
+        workers=max(2, os.cpu_count() or 1)
+    )
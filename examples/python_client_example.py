@@ -3,33 +3,97 @@ Python FastAPI 客户端示例
 展示如何从 Python 调用 Rust 聊天服务的 API
 """
 
+import asyncio
+import binascii
+import functools
 import hashlib
 import hmac
+import logging
+import os
+import secrets
+import socket
+import threading
 import time
 import uuid
+import aiohttp
+import ijson
+import orjson
 import requests
-from typing import Optional
+from requests.adapters import HTTPAdapter
+from cachetools import TTLCache
+from typing import AsyncIterator, Iterator, Optional
+from urllib3.util.retry import Retry
 
+logger = logging.getLogger(__name__)
 
-class RustChatClient:
-    """Rust 聊天服务客户端"""
+COMMENT_SUMMARY_FIELDS = "id,created_at,reply_count"
+
+
+@functools.lru_cache(maxsize=1024)
+def _publish_body_prefix(username: str) -> bytes:
+    """同一用户连续发消息时，复用已序列化好的 {"username": ..., "content": 前缀"""
+    return b'{"username":' + orjson.dumps(username) + b',"content":'
+
+
+class _TCPOptionsAdapter(HTTPAdapter):
+    """为连接池中的每个连接开启 TCP_NODELAY 与 SO_KEEPALIVE"""
+    
+    socket_options = [
+        (socket.IPPROTO_TCP, socket.TCP_NODELAY, 1),  # 小包 JSON 请求不等待 Nagle 合并
+        (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),  # 及时发现被对端回收的空闲连接
+    ]
+    
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["socket_options"] = self.socket_options
+        super().init_poolmanager(*args, **kwargs)
+
+
+class _RustChatClientBase:
+    """同步 / 异步客户端共用的签名与请求头逻辑"""
     
-    def __init__(self, base_url: str = "http://127.0.0.1:8081", auth_secret: str = "sso-secret"):
+    def __init__(self, base_url: str = "http://127.0.0.1:8081", auth_secret: str = "sso-secret", *,
+                 read_cache_ttl: float = 2.0):
         self.base_url = base_url
         self.auth_secret = auth_secret
         self.jwt_token: Optional[str] = None
+        
+        # 不含路径参数的接口地址只拼接一次
+        self._url_login = f"{base_url}/auth/login"
+        self._url_social_action = f"{base_url}/api/social/action"
+        self._url_comments = f"{base_url}/api/comments"
+        self._url_reactions = f"{base_url}/api/reactions"
+        
+        # 预先完成密钥填充，每次签名只需 copy() 已初始化的 HMAC 状态
+        self._hmac_template = hmac.new(auth_secret.encode('utf-8'), b'', hashlib.sha256)
+        
+        # 批量读取随机字节，减少每次请求的 os.urandom 系统调用
+        self._rand_buf = b''
+        self._rand_off = 0
+        self._rand_lock = threading.Lock()
+        
+        # 只读接口（帖子状态 / 评论列表）的短时缓存，写操作后按帖子失效；read_cache_ttl=0 关闭
+        self._read_cache: Optional[TTLCache] = (
+            TTLCache(maxsize=4096, ttl=read_cache_ttl) if read_cache_ttl > 0 else None
+        )
+        self._read_cache_lock = threading.Lock()
+        # 失效代数：写操作失效时递增，读请求发出前后代数不同则结果已过时，不写入缓存
+        self._post_gen: dict = {}
+        self._comments_gen = 0
     
     def _generate_uid_hash(self) -> str:
         """生成 36 位字母数字的 uid_hash"""
-        return str(uuid.uuid4()).replace("-", "")
+        with self._rand_lock:
+            if self._rand_off + 16 > len(self._rand_buf):
+                self._rand_buf = os.urandom(4096)
+                self._rand_off = 0
+            chunk = self._rand_buf[self._rand_off:self._rand_off + 16]
+            self._rand_off += 16
+        return binascii.hexlify(chunk).decode('ascii')
     
     def _generate_signature(self, canonical: str) -> str:
         """生成 HMAC-SHA256 签名"""
-        mac = hmac.new(
-            self.auth_secret.encode('utf-8'),
-            canonical.encode('utf-8'),
-            hashlib.sha256
-        )
+        mac = self._hmac_template.copy()
+        mac.update(canonical.encode('utf-8'))
         return mac.hexdigest()
     
     def _get_auth_params(self, **params) -> dict:
@@ -38,15 +102,13 @@ class RustChatClient:
         nonce = str(uuid.uuid4())
         uid_hash = self._generate_uid_hash()
         
-        # 构建规范字符串（按字母顺序排列参数）
-        sorted_params = sorted(params.items())
-        canonical_parts = [f"{k}={v}" for k, v in sorted_params]
-        canonical_parts.extend([
+        # 构建规范字符串（业务参数按字母顺序排列，ts/nonce/uid_hash 固定追加在末尾）
+        canonical = "&".join([
+            *[f"{k}={v}" for k, v in sorted(params.items())],
             f"ts={ts}",
             f"nonce={nonce}",
             f"uid_hash={uid_hash}"
         ])
-        canonical = "&".join(canonical_parts)
         
         sig = self._generate_signature(canonical)
         
@@ -57,144 +119,239 @@ class RustChatClient:
             "sig": sig
         }
     
-    def _get_headers(self) -> dict:
-        """获取请求头"""
+    @staticmethod
+    def _json(payload: dict) -> bytes:
+        """序列化请求体（orjson 直接输出 bytes，作为 data= 发送）"""
+        return orjson.dumps(payload)
+    
+    def _cache_get(self, key: tuple):
+        """读取只读接口缓存，未命中返回 None"""
+        if self._read_cache is None:
+            return None
+        with self._read_cache_lock:
+            return self._read_cache.get(key)
+    
+    def _cache_generation(self, post_id: int) -> Optional[tuple]:
+        """读请求发出前取帖子的失效代数快照，交给 _cache_put 校验"""
+        if self._read_cache is None:
+            return None
+        with self._read_cache_lock:
+            return self._post_gen.get(post_id, 0), self._comments_gen
+    
+    def _cache_put(self, key: tuple, value, generation: Optional[tuple]):
+        """写入只读接口缓存；请求期间帖子被失效过（代数变化）则丢弃，避免写前的旧数据回填"""
+        if self._read_cache is None:
+            return
+        with self._read_cache_lock:
+            if generation == (self._post_gen.get(key[1], 0), self._comments_gen):
+                self._read_cache[key] = value
+    
+    def _invalidate_post(self, post_id: int):
+        """帖子发生写操作后，丢弃其状态与评论缓存"""
+        if self._read_cache is None:
+            return
+        with self._read_cache_lock:
+            self._post_gen[post_id] = self._post_gen.get(post_id, 0) + 1
+            self._read_cache.pop(("status", post_id), None)
+            self._read_cache.pop(("comments", post_id), None)
+    
+    def _invalidate_comments(self):
+        """删除评论时无法得知所属帖子，丢弃全部评论列表缓存"""
+        if self._read_cache is None:
+            return
+        with self._read_cache_lock:
+            self._comments_gen += 1
+            for key in [k for k in self._read_cache if k[0] == "comments"]:
+                self._read_cache.pop(key, None)
+    
+    @property
+    def jwt_token(self) -> Optional[str]:
+        return self._jwt_token
+    
+    @jwt_token.setter
+    def jwt_token(self, token: Optional[str]):
+        # token 只在登录时变化，请求头随之重建一次，之后每个请求直接复用
+        self._jwt_token = token
         headers = {"Content-Type": "application/json"}
-        if self.jwt_token:
-            headers["Authorization"] = f"Bearer {self.jwt_token}"
-        return headers
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        self._headers = headers
     
-    def login(self, username: str = "py-bot", password: str = "password") -> bool:
-        """登录获取 JWT Token"""
-        url = f"{self.base_url}/auth/login"
-        data = {"username": username, "password": password}
-        
-        try:
-            response = requests.post(url, json=data)
-            response.raise_for_status()
-            result = response.json()
-            if result.get("code") == 0:
-                self.jwt_token = result["data"]["token"]
-                print(f"✓ 登录成功，获取到 JWT Token")
-                return True
-            else:
-                print(f"✗ 登录失败: {result.get('message')}")
-                return False
-        except Exception as e:
-            print(f"✗ 登录异常: {e}")
-            return False
+    def _get_headers(self) -> dict:
+        """获取请求头（共享字典，调用方不要修改）"""
+        return self._headers
     
-    def publish_message(self, room_id: str, username: str, content: str) -> bool:
-        """发布消息到聊天室"""
-        url = f"{self.base_url}/api/rooms/{room_id}/publish"
-        
+    @staticmethod
+    def _log_result(ok: bool, result: dict, action: str) -> bool:
+        """记录调用结果；成功走 INFO（生产环境通常关闭），失败走 WARNING"""
+        if ok:
+            logger.info("✓ %s成功", action)
+        elif "status" in result:
+            logger.warning("✗ %s失败: HTTP %d %s", action, result["status"], result.get("message"))
+        else:
+            logger.warning("✗ %s失败: %s", action, result.get("message"))
+        return ok
+    
+    def _comment_request(self, post_id: int, author_id: int, content: str,
+                         parent_comment_id: Optional[int], at_user_id: Optional[int]) -> tuple:
+        """构造创建评论的签名参数与请求体"""
+        auth_params = self._get_auth_params(post_id=post_id, author_id=author_id, content=content)
+        data = {
+            "post_id": post_id,
+            "author_id": author_id,
+            "content": content,
+            "parent_comment_id": parent_comment_id,
+            "at_user_id": at_user_id,
+            "idempotency_key": secrets.token_hex(16)
+        }
+        return auth_params, self._json(data)
+    
+    def _reaction_request(self, resource_type: int, resource_id: int,
+                          reactor_id: int, reaction_type: int) -> tuple:
+        """构造添加反应的签名参数与请求体"""
         auth_params = self._get_auth_params(
-            room_id=room_id,
-            username=username,
-            content=content
+            resource_type=resource_type,
+            resource_id=resource_id,
+            reactor_id=reactor_id,
+            reaction_type=reaction_type
         )
+        data = {
+            "resource_type": resource_type,
+            "resource_id": resource_id,
+            "reactor_id": reactor_id,
+            "reaction_type": reaction_type,
+            "idempotency_key": secrets.token_hex(16)
+        }
+        return auth_params, self._json(data)
+    
+    def _post_status_from(self, post_id: int, result: dict, generation: Optional[tuple]) -> dict:
+        """把帖子状态接口的信封转换为状态字典；0 / 404 / 410 都是确定结果，写入缓存"""
+        code = result.get("code")
+        if code in (0, 404, 410):
+            status = result.get("data", {})
+            if code == 0:
+                logger.info("✓ 帖子状态: %s", status.get("message"))
+            else:
+                logger.warning("✗ 帖子状态: %s", status.get("message", result.get("message")))
+            self._cache_put(("status", post_id), status, generation)
+            return status
+        logger.warning("✗ 检查帖子状态失败: %s", result.get("message"))
+        return {"exists": False, "deleted": False, "locked": False, "message": result.get("message", "未知错误")}
+    
+    def _summary_params(self, post_id: int) -> dict:
+        """精简评论列表的查询参数：fields 只选择投影，不参与签名"""
+        return {**self._get_auth_params(post_id=post_id), "fields": COMMENT_SUMMARY_FIELDS}
+    
+    def _comments_from(self, post_id: int, ok: bool, result: dict, generation: Optional[tuple]) -> list:
+        """从评论列表接口的信封中取出评论树，成功时写入缓存"""
+        if not ok:
+            logger.warning("✗ 获取评论失败: %s", result.get("message"))
+            return []
+        comments = result.get("data", [])
+        logger.info("✓ 获取评论成功: 共 %d 条一级评论", len(comments))
+        self._cache_put(("comments", post_id), comments, generation)
+        return comments
+
+
+class RustChatClient(_RustChatClientBase):
+    """Rust 聊天服务客户端"""
+    
+    def __init__(self, base_url: str = "http://127.0.0.1:8081", auth_secret: str = "sso-secret", *,
+                 read_cache_ttl: float = 2.0, timeout: float = 10.0,
+                 session: Optional[requests.Session] = None):
+        super().__init__(base_url, auth_secret, read_cache_ttl=read_cache_ttl)
+        self.timeout = timeout
+        
+        # 允许注入外部管理的 Session（例如测试中多个客户端共享一个连接池）
+        self._owns_session = session is None
+        if session is None:
+            # 复用连接池，避免每次请求都重新建立 TCP 连接
+            session = requests.Session()
+            adapter = _TCPOptionsAdapter(
+                pool_connections=32,
+                pool_maxsize=64,
+                max_retries=Retry(total=2, backoff_factor=0.1)
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        self._session = session
+    
+    def close(self):
+        """关闭连接池（只关闭客户端自己创建的 Session）"""
+        if self._owns_session:
+            self._session.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+    
+    def _call(self, method: str, url: str, params: Optional[dict] = None,
+              data: Optional[bytes] = None, headers: Optional[dict] = None) -> tuple:
+        """发送请求并解码响应信封，返回 (是否成功, 信封)
         
-        data = {"username": username, "content": content}
-        
+        网络异常记为 code=-1；响应不是 JSON（如 axum 纯文本的 404/405/422 拒绝）时同样记为 code=-1，
+        并在 status 中保留 HTTP 状态码、message 中保留响应正文
+        """
         try:
-            response = requests.post(
+            response = self._session.request(
+                method,
                 url,
-                json=data,
-                params=auth_params,
-                headers=self._get_headers()
+                data=data,
+                params=params,
+                headers=self._headers if headers is None else {**self._headers, **headers},
+                timeout=self.timeout
             )
-            response.raise_for_status()
-            result = response.json()
-            if result.get("code") == 0:
-                print(f"✓ 消息发布成功: {content}")
-                return True
-            else:
-                print(f"✗ 消息发布失败: {result.get('message')}")
-                return False
         except Exception as e:
-            print(f"✗ 消息发布异常: {e}")
-            return False
+            return False, {"code": -1, "message": str(e)}
+        try:
+            result = orjson.loads(response.content)
+        except orjson.JSONDecodeError:
+            result = {"code": -1, "status": response.status_code, "message": response.text or response.reason}
+        return result.get("code") == 0, result
+    
+    def login(self, username: str = "py-bot", password: str = "password") -> bool:
+        """登录获取 JWT Token"""
+        data = {"username": username, "password": password}
+        ok, result = self._call("POST", self._url_login, data=self._json(data))
+        if ok:
+            self.jwt_token = result["data"]["token"]
+        return self._log_result(ok, result, "登录")
+    
+    def publish_message(self, room_id: str, username: str, content: str) -> bool:
+        """发布消息到聊天室"""
+        url = f"{self.base_url}/api/rooms/{room_id}/publish"
+        auth_params = self._get_auth_params(room_id=room_id, username=username, content=content)
+        body = _publish_body_prefix(username) + orjson.dumps(content) + b'}'
+        ok, result = self._call("POST", url, auth_params, body)
+        return self._log_result(ok, result, "消息发布")
     
     def get_room_users(self, room_id: str) -> list:
         """获取房间用户列表"""
         url = f"{self.base_url}/api/rooms/{room_id}/users"
-        
-        auth_params = self._get_auth_params(room_id=room_id)
-        
-        try:
-            response = requests.get(
-                url,
-                params=auth_params,
-                headers=self._get_headers()
-            )
-            response.raise_for_status()
-            result = response.json()
-            if result.get("code") == 0:
-                users = result.get("data", [])
-                print(f"✓ 获取房间用户成功: {users}")
-                return users
-            else:
-                print(f"✗ 获取房间用户失败: {result.get('message')}")
-                return []
-        except Exception as e:
-            print(f"✗ 获取房间用户异常: {e}")
-            return []
+        ok, result = self._call("GET", url, self._get_auth_params(room_id=room_id))
+        return result.get("data", []) if self._log_result(ok, result, "获取房间用户") else []
     
     def search_users(self, room_id: str, query: str) -> list:
         """搜索房间用户"""
         url = f"{self.base_url}/api/rooms/{room_id}/search"
-        
         auth_params = self._get_auth_params(room_id=room_id, q=query)
         auth_params["q"] = query
-        
-        try:
-            response = requests.get(
-                url,
-                params=auth_params,
-                headers=self._get_headers()
-            )
-            response.raise_for_status()
-            result = response.json()
-            if result.get("code") == 0:
-                users = result.get("data", [])
-                print(f"✓ 搜索用户成功: {users}")
-                return users
-            else:
-                print(f"✗ 搜索用户失败: {result.get('message')}")
-                return []
-        except Exception as e:
-            print(f"✗ 搜索用户异常: {e}")
-            return []
+        ok, result = self._call("GET", url, auth_params)
+        return result.get("data", []) if self._log_result(ok, result, "搜索用户") else []
     
     def social_action(self, action: str, target: str) -> bool:
         """执行社交操作（follow/unfollow/block/unblock/mute/unmute）"""
-        url = f"{self.base_url}/api/social/action"
-        
         auth_params = self._get_auth_params(action=action, target=target)
         data = {"action": action, "target": target}
-        
-        try:
-            response = requests.post(
-                url,
-                json=data,
-                params=auth_params,
-                headers=self._get_headers()
-            )
-            response.raise_for_status()
-            result = response.json()
-            if result.get("code") == 0:
-                print(f"✓ 社交操作成功: {action} {target}")
-                return True
-            else:
-                print(f"✗ 社交操作失败: {result.get('message')}")
-                return False
-        except Exception as e:
-            print(f"✗ 社交操作异常: {e}")
-            return False
+        ok, result = self._call("POST", self._url_social_action, auth_params, self._json(data))
+        return self._log_result(ok, result, "社交操作")
     
     def create_comment(self, post_id: int, author_id: int, content: str, 
                       parent_comment_id: Optional[int] = None,
-                      at_user_id: Optional[int] = None) -> Optional[dict]:
+                      at_user_id: Optional[int] = None,
+                      headers: Optional[dict] = None) -> Optional[dict]:
         """创建评论
         
         Args:
@@ -203,45 +360,14 @@ class RustChatClient:
             content: 评论内容
             parent_comment_id: 父评论ID（一级评论为None，二级回复填父评论ID）
             at_user_id: @的用户ID（可选）
+            headers: 额外请求头（可选，例如测试用的 X-Test-Clock-Offset）
         """
-        url = f"{self.base_url}/api/comments"
-        
-        idempotency_key = str(uuid.uuid4())
-        
-        auth_params = self._get_auth_params(
-            post_id=post_id,
-            author_id=author_id,
-            content=content
-        )
-        
-        data = {
-            "post_id": post_id,
-            "author_id": author_id,
-            "content": content,
-            "parent_comment_id": parent_comment_id,
-            "at_user_id": at_user_id,
-            "idempotency_key": idempotency_key
-        }
-        
+        auth_params, body = self._comment_request(post_id, author_id, content, parent_comment_id, at_user_id)
         try:
-            response = requests.post(
-                url,
-                json=data,
-                params=auth_params,
-                headers=self._get_headers()
-            )
-            response.raise_for_status()
-            result = response.json()
-            if result.get("code") == 0:
-                comment = result.get("data")
-                print(f"✓ 评论创建成功: ID={comment.get('id')}")
-                return comment
-            else:
-                print(f"✗ 评论创建失败: {result.get('message')}")
-                return None
-        except Exception as e:
-            print(f"✗ 评论创建异常: {e}")
-            return None
+            ok, result = self._call("POST", self._url_comments, auth_params, body, headers)
+        finally:
+            self._invalidate_post(post_id)
+        return result.get("data") if self._log_result(ok, result, "评论创建") else None
     
     def check_post_status(self, post_id: int) -> dict:
         """检查帖子状态（用于前端验证帖子是否存在）
@@ -254,39 +380,14 @@ class RustChatClient:
             "message": "状态描述"
         }
         """
-        url = f"{self.base_url}/api/posts/{post_id}/status"
-        
-        auth_params = self._get_auth_params(post_id=post_id)
+        cached = self._cache_get(("status", post_id))
+        if cached is not None:
+            return cached
         
-        try:
-            response = requests.get(
-                url,
-                params=auth_params,
-                headers=self._get_headers()
-            )
-            result = response.json()
-            
-            if result.get("code") == 0:
-                # 帖子正常
-                status = result.get("data", {})
-                print(f"✓ 帖子状态: {status.get('message')}")
-                return status
-            elif result.get("code") == 404:
-                # 帖子不存在
-                status = result.get("data", {})
-                print(f"✗ {status.get('message', '帖子不存在')}")
-                return status
-            elif result.get("code") == 410:
-                # 帖子已删除
-                status = result.get("data", {})
-                print(f"✗ {status.get('message', '帖子已被删除')}")
-                return status
-            else:
-                print(f"✗ 检查帖子状态失败: {result.get('message')}")
-                return {"exists": False, "deleted": False, "locked": False, "message": "未知错误"}
-        except Exception as e:
-            print(f"✗ 检查帖子状态异常: {e}")
-            return {"exists": False, "deleted": False, "locked": False, "message": str(e)}
+        generation = self._cache_generation(post_id)
+        url = f"{self.base_url}/api/posts/{post_id}/status"
+        _, result = self._call("GET", url, self._get_auth_params(post_id=post_id))
+        return self._post_status_from(post_id, result, generation)
     
     def get_comments(self, post_id: int) -> list:
         """获取帖子的评论列表（嵌套结构）
@@ -312,55 +413,61 @@ class RustChatClient:
             }
         ]
         """
+        cached = self._cache_get(("comments", post_id))
+        if cached is not None:
+            return cached
+        
+        generation = self._cache_generation(post_id)
         url = f"{self.base_url}/api/posts/{post_id}/comments"
+        ok, result = self._call("GET", url, self._get_auth_params(post_id=post_id))
+        return self._comments_from(post_id, ok, result, generation)
+    
+    def get_comments_summary(self, post_id: int) -> list:
+        """获取评论列表的精简投影，只含一级评论的 id / created_at / reply_count
         
-        auth_params = self._get_auth_params(post_id=post_id)
+        适合只关心条数、排序的场景，服务端不返回正文与回复，传输量更小；结果不写入读缓存
+        """
+        url = f"{self.base_url}/api/posts/{post_id}/comments"
+        ok, result = self._call("GET", url, self._summary_params(post_id))
+        return result.get("data", []) if self._log_result(ok, result, "获取评论摘要") else []
+    
+    def iter_comments(self, post_id: int) -> Iterator[dict]:
+        """逐条产出一级评论（含 replies），边接收边解析，评论量很大的帖子不必物化整棵评论树
         
+        与 get_comments 不同，结果不会写入读缓存
+        """
+        cached = self._cache_get(("comments", post_id))
+        if cached is not None:
+            yield from cached
+            return
+        
+        url = f"{self.base_url}/api/posts/{post_id}/comments"
         try:
-            response = requests.get(
+            response = self._session.get(
                 url,
-                params=auth_params,
-                headers=self._get_headers()
+                params=self._get_auth_params(post_id=post_id),
+                headers=self._headers,
+                timeout=self.timeout,
+                stream=True
             )
-            response.raise_for_status()
-            result = response.json()
-            if result.get("code") == 0:
-                comments = result.get("data", [])
-                print(f"✓ 获取评论成功: 共 {len(comments)} 条一级评论")
-                return comments
-            else:
-                print(f"✗ 获取评论失败: {result.get('message')}")
-                return []
         except Exception as e:
-            print(f"✗ 获取评论异常: {e}")
-            return []
+            logger.warning("✗ 获取评论失败: %s", e)
+            return
+        with response:
+            if response.status_code != 200:
+                logger.warning("✗ 获取评论失败: HTTP %d", response.status_code)
+                return
+            response.raw.decode_content = True
+            yield from ijson.items(response.raw, "data.item", use_float=True)
     
     def delete_post(self, post_id: int) -> bool:
         """删除帖子（软删除，会级联删除所有评论和反应）"""
         url = f"{self.base_url}/api/posts/{post_id}"
-        
-        auth_params = self._get_auth_params(post_id=post_id)
-        
         try:
-            response = requests.delete(
-                url,
-                params=auth_params,
-                headers=self._get_headers()
-            )
-            if response.status_code == 410:
-                print(f"✗ 帖子已被删除: ID={post_id}")
-                return False
-            response.raise_for_status()
-            result = response.json()
-            if result.get("code") == 0:
-                print(f"✓ 帖子删除成功: ID={post_id} - {result.get('message')}")
-                return True
-            else:
-                print(f"✗ 帖子删除失败: {result.get('message')}")
-                return False
-        except Exception as e:
-            print(f"✗ 帖子删除异常: {e}")
-            return False
+            ok, result = self._call("DELETE", url, self._get_auth_params(post_id=post_id))
+        finally:
+            self._invalidate_post(post_id)
+        return self._log_result(ok, result, f"帖子删除 ID={post_id}")
     
     def delete_comment(self, comment_id: int) -> bool:
         """删除评论（软删除）
@@ -369,74 +476,216 @@ class RustChatClient:
         - 如果是二级回复，只删除该回复
         """
         url = f"{self.base_url}/api/comments/{comment_id}"
-        
-        auth_params = self._get_auth_params(comment_id=comment_id)
-        
         try:
-            response = requests.delete(
-                url,
-                params=auth_params,
-                headers=self._get_headers()
-            )
-            if response.status_code == 410:
-                print(f"✗ 评论已被删除: ID={comment_id}")
-                return False
-            response.raise_for_status()
-            result = response.json()
-            if result.get("code") == 0:
-                print(f"✓ 评论删除成功: ID={comment_id} - {result.get('message')}")
-                return True
-            else:
-                print(f"✗ 评论删除失败: {result.get('message')}")
-                return False
-        except Exception as e:
-            print(f"✗ 评论删除异常: {e}")
-            return False
+            ok, result = self._call("DELETE", url, self._get_auth_params(comment_id=comment_id))
+        finally:
+            self._invalidate_comments()
+        return self._log_result(ok, result, f"评论删除 ID={comment_id}")
     
     def add_reaction(self, resource_type: int, resource_id: int, 
                     reactor_id: int, reaction_type: int) -> bool:
         """添加反应（点赞/收藏）"""
-        url = f"{self.base_url}/api/reactions"
+        auth_params, body = self._reaction_request(resource_type, resource_id, reactor_id, reaction_type)
+        ok, result = self._call("POST", self._url_reactions, auth_params, body)
+        return self._log_result(ok, result, "反应添加")
+
+
+class AsyncRustChatClient(_RustChatClientBase):
+    """Rust 聊天服务异步客户端（基于 aiohttp.ClientSession，供 FastAPI 等异步框架使用）"""
+    
+    def __init__(self, base_url: str = "http://127.0.0.1:8081", auth_secret: str = "sso-secret", *,
+                 read_cache_ttl: float = 2.0, session: Optional[aiohttp.ClientSession] = None):
+        super().__init__(base_url, auth_secret, read_cache_ttl=read_cache_ttl)
         
-        idempotency_key = str(uuid.uuid4())
+        # 允许注入由外部管理生命周期的 ClientSession（例如 FastAPI lifespan 中创建的单例）
+        self._owns_session = session is None
+        self._session = session
         
-        auth_params = self._get_auth_params(
-            resource_type=resource_type,
-            resource_id=resource_id,
-            reactor_id=reactor_id,
-            reaction_type=reaction_type
-        )
+        # 同一帖子并发的状态查询合并为一次 RPC（single-flight）
+        self._inflight: dict = {}
+    
+    def _http(self) -> aiohttp.ClientSession:
+        """获取连接池；未注入时在首次请求（已处于事件循环中）时创建"""
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=100, limit_per_host=50, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=10)
+            )
+        return self._session
+    
+    async def aclose(self):
+        """关闭连接池（只关闭客户端自己创建的 ClientSession）"""
+        if self._owns_session and self._session is not None:
+            await self._session.close()
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
+    
+    async def _call(self, method: str, url: str, params: Optional[dict] = None,
+                    data: Optional[bytes] = None, headers: Optional[dict] = None) -> tuple:
+        """发送请求并解码响应信封，返回 (是否成功, 信封)；非 JSON 响应在 status 中保留 HTTP 状态码"""
+        try:
+            async with self._http().request(
+                method,
+                url,
+                data=data,
+                params=params,
+                headers=self._headers if headers is None else {**self._headers, **headers}
+            ) as response:
+                body = await response.read()
+                try:
+                    result = orjson.loads(body)
+                except orjson.JSONDecodeError:
+                    result = {"code": -1, "status": response.status,
+                              "message": body.decode("utf-8", "replace") or (response.reason or "")}
+        except Exception as e:
+            result = {"code": -1, "message": str(e)}
+        return result.get("code") == 0, result
+    
+    async def login(self, username: str = "py-bot", password: str = "password") -> bool:
+        """登录获取 JWT Token"""
+        data = {"username": username, "password": password}
+        ok, result = await self._call("POST", self._url_login, data=self._json(data))
+        if ok:
+            self.jwt_token = result["data"]["token"]
+        return self._log_result(ok, result, "登录")
+    
+    async def publish_message(self, room_id: str, username: str, content: str) -> bool:
+        """发布消息到聊天室"""
+        url = f"{self.base_url}/api/rooms/{room_id}/publish"
+        auth_params = self._get_auth_params(room_id=room_id, username=username, content=content)
+        body = _publish_body_prefix(username) + orjson.dumps(content) + b'}'
+        ok, result = await self._call("POST", url, auth_params, body)
+        return self._log_result(ok, result, "消息发布")
+    
+    async def get_room_users(self, room_id: str) -> list:
+        """获取房间用户列表"""
+        url = f"{self.base_url}/api/rooms/{room_id}/users"
+        ok, result = await self._call("GET", url, self._get_auth_params(room_id=room_id))
+        return result.get("data", []) if self._log_result(ok, result, "获取房间用户") else []
+    
+    async def search_users(self, room_id: str, query: str) -> list:
+        """搜索房间用户"""
+        url = f"{self.base_url}/api/rooms/{room_id}/search"
+        auth_params = self._get_auth_params(room_id=room_id, q=query)
+        auth_params["q"] = query
+        ok, result = await self._call("GET", url, auth_params)
+        return result.get("data", []) if self._log_result(ok, result, "搜索用户") else []
+    
+    async def social_action(self, action: str, target: str) -> bool:
+        """执行社交操作（follow/unfollow/block/unblock/mute/unmute）"""
+        auth_params = self._get_auth_params(action=action, target=target)
+        data = {"action": action, "target": target}
+        ok, result = await self._call("POST", self._url_social_action, auth_params, self._json(data))
+        return self._log_result(ok, result, "社交操作")
+    
+    async def create_comment(self, post_id: int, author_id: int, content: str,
+                             parent_comment_id: Optional[int] = None,
+                             at_user_id: Optional[int] = None,
+                             headers: Optional[dict] = None) -> Optional[dict]:
+        """创建评论"""
+        auth_params, body = self._comment_request(post_id, author_id, content, parent_comment_id, at_user_id)
+        try:
+            ok, result = await self._call("POST", self._url_comments, auth_params, body, headers)
+        finally:
+            self._invalidate_post(post_id)
+        return result.get("data") if self._log_result(ok, result, "评论创建") else None
+    
+    async def check_post_status(self, post_id: int) -> dict:
+        """检查帖子状态（用于前端验证帖子是否存在）；同一帖子的并发查询共享一次 RPC"""
+        cached = self._cache_get(("status", post_id))
+        if cached is not None:
+            return cached
+        
+        task = self._inflight.get(post_id)
+        if task is None:
+            task = asyncio.create_task(self._fetch_post_status(post_id))
+            self._inflight[post_id] = task
+            task.add_done_callback(lambda _: self._inflight.pop(post_id, None))
+        # shield：某个调用方被取消时不影响其余等待同一结果的调用方
+        return await asyncio.shield(task)
+    
+    async def _fetch_post_status(self, post_id: int) -> dict:
+        generation = self._cache_generation(post_id)
+        url = f"{self.base_url}/api/posts/{post_id}/status"
+        _, result = await self._call("GET", url, self._get_auth_params(post_id=post_id))
+        return self._post_status_from(post_id, result, generation)
+    
+    async def get_comments(self, post_id: int) -> list:
+        """获取帖子的评论列表（嵌套结构）"""
+        cached = self._cache_get(("comments", post_id))
+        if cached is not None:
+            return cached
         
-        data = {
-            "resource_type": resource_type,
-            "resource_id": resource_id,
-            "reactor_id": reactor_id,
-            "reaction_type": reaction_type,
-            "idempotency_key": idempotency_key
-        }
+        generation = self._cache_generation(post_id)
+        url = f"{self.base_url}/api/posts/{post_id}/comments"
+        ok, result = await self._call("GET", url, self._get_auth_params(post_id=post_id))
+        return self._comments_from(post_id, ok, result, generation)
+    
+    async def get_comments_summary(self, post_id: int) -> list:
+        """获取评论列表的精简投影（id / created_at / reply_count）"""
+        url = f"{self.base_url}/api/posts/{post_id}/comments"
+        ok, result = await self._call("GET", url, self._summary_params(post_id))
+        return result.get("data", []) if self._log_result(ok, result, "获取评论摘要") else []
+    
+    async def aiter_comments(self, post_id: int) -> AsyncIterator[dict]:
+        """逐条产出一级评论（含 replies），边接收边解析，结果不写入读缓存"""
+        cached = self._cache_get(("comments", post_id))
+        if cached is not None:
+            for comment in cached:
+                yield comment
+            return
         
+        url = f"{self.base_url}/api/posts/{post_id}/comments"
         try:
-            response = requests.post(
+            response = await self._http().get(
                 url,
-                json=data,
-                params=auth_params,
-                headers=self._get_headers()
+                params=self._get_auth_params(post_id=post_id),
+                headers=self._headers
             )
-            response.raise_for_status()
-            result = response.json()
-            if result.get("code") == 0:
-                print(f"✓ 反应添加成功")
-                return True
-            else:
-                print(f"✗ 反应添加失败: {result.get('message')}")
-                return False
         except Exception as e:
-            print(f"✗ 反应添加异常: {e}")
-            return False
+            logger.warning("✗ 获取评论失败: %s", e)
+            return
+        async with response:
+            if response.status != 200:
+                logger.warning("✗ 获取评论失败: HTTP %d", response.status)
+                return
+            async for comment in ijson.items(response.content, "data.item", use_float=True):
+                yield comment
+    
+    async def delete_post(self, post_id: int) -> bool:
+        """删除帖子（软删除，会级联删除所有评论和反应）"""
+        url = f"{self.base_url}/api/posts/{post_id}"
+        try:
+            ok, result = await self._call("DELETE", url, self._get_auth_params(post_id=post_id))
+        finally:
+            self._invalidate_post(post_id)
+        return self._log_result(ok, result, f"帖子删除 ID={post_id}")
+    
+    async def delete_comment(self, comment_id: int) -> bool:
+        """删除评论（软删除）"""
+        url = f"{self.base_url}/api/comments/{comment_id}"
+        try:
+            ok, result = await self._call("DELETE", url, self._get_auth_params(comment_id=comment_id))
+        finally:
+            self._invalidate_comments()
+        return self._log_result(ok, result, f"评论删除 ID={comment_id}")
+    
+    async def add_reaction(self, resource_type: int, resource_id: int,
+                           reactor_id: int, reaction_type: int) -> bool:
+        """添加反应（点赞/收藏）"""
+        auth_params, body = self._reaction_request(resource_type, resource_id, reactor_id, reaction_type)
+        ok, result = await self._call("POST", self._url_reactions, auth_params, body)
+        return self._log_result(ok, result, "反应添加")
 
 
 def main():
     """示例：演示如何使用客户端"""
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    
     print("=" * 60)
     print("Rust 聊天服务 Python 客户端示例")
     print("=" * 60)
@@ -497,6 +746,8 @@ def main():
         reaction_type=1  # 1=like
     )
     
+    client.close()
+    
     print("\n" + "=" * 60)
     print("测试完成！")
     print("=" * 60)
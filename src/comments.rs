@@ -25,6 +25,15 @@ pub struct CreateCommentInput {
     pub at_user_id: Option<i64>,
     pub idempotency_key: String,
     pub ip_key: String,
+    pub clock_offset_ms: i64, // 测试钩子：评论间隔检查使用的时钟偏移（毫秒），生产环境恒为 0
+}
+
+// 批量评论条目：parent_index 引用同一批次中前面的条目（回复同批创建的一级评论），仅 test-hooks 构建
+#[cfg(feature = "test-hooks")]
+#[derive(Debug, Clone)]
+pub struct BatchCommentInput {
+    pub input: CreateCommentInput,
+    pub parent_index: Option<usize>,
 }
 
 #[derive(sqlx::FromRow, Debug, Clone)]
@@ -79,7 +88,7 @@ impl CommentService {
     }
 
     // 检查用户是否在短时间内连续评论
-    async fn check_comment_interval(&self, author_id: i64, post_id: i64) -> Result<(), DomainError> {
+    async fn check_comment_interval(&self, author_id: i64, post_id: i64, clock_offset_ms: i64) -> Result<(), DomainError> {
         // 查询用户在该帖子下的最后一条评论时间
         let last_comment = sqlx::query_as::<Postgres, (DateTime<Utc>,)>(
             r#"SELECT created_at FROM comments 
@@ -94,7 +103,7 @@ impl CommentService {
         .map_err(|e| DomainError::Db(e.to_string()))?;
 
         if let Some((last_time,)) = last_comment {
-            let now = Utc::now();
+            let now = Utc::now() + chrono::Duration::milliseconds(clock_offset_ms);
             let elapsed = (now - last_time).num_seconds();
             
             if elapsed < COMMENT_INTERVAL_SECONDS {
@@ -106,6 +115,38 @@ impl CommentService {
         Ok(())
     }
 
+    // 行级锁检查父评论：存在、未删除、且本身是一级评论（只允许二层）
+    async fn check_parent_tx(&self, tx: &mut Transaction<'_, Postgres>, parent_id: i64) -> Result<(), DomainError> {
+        let parent_status = sqlx::query_as::<Postgres, (Option<i64>, Option<DateTime<Utc>>)>(
+            r#"SELECT parent_comment_id, deleted_at FROM comments WHERE id = $1 FOR UPDATE NOWAIT"#
+        )
+        .bind(parent_id)
+        .fetch_optional(tx.as_mut())
+        .await;
+        
+        match parent_status {
+            Ok(Some((parent_comment_id, deleted_at))) => {
+                // 检查父评论是否已删除
+                if deleted_at.is_some() { 
+                    return Err(DomainError::Gone); // 父评论已删除，不能回复
+                }
+                // 检查是否超过最大楼层深度（只允许二层）
+                if parent_comment_id.is_some() { 
+                    return Err(DomainError::Validation("超过最大楼层深度，只支持二层评论".into())); 
+                }
+                Ok(())
+            }
+            Ok(None) => Err(DomainError::NotFound), // 父评论不存在
+            Err(e) => {
+                let err_msg = e.to_string();
+                if err_msg.contains("could not obtain lock") {
+                    return Err(DomainError::Locked); // 父评论正在被操作（可能正在删除）
+                }
+                Err(DomainError::Db(err_msg))
+            }
+        }
+    }
+
     // 行级锁获取Post以判断锁帖/删除
     async fn load_post_for_update(&self, tx: &mut Transaction<'_, Postgres>, post_id: i64) -> Result<(Option<DateTime<Utc>>, Option<DateTime<Utc>>), DomainError> {
         let row = sqlx::query_as::<Postgres, (Option<DateTime<Utc>>, Option<DateTime<Utc>>)>(
@@ -131,7 +172,7 @@ impl CommentService {
         }
 
         // 2. 检查连续评论间隔（防止短时间内重复评论）
-        self.check_comment_interval(input.author_id, input.post_id).await?;
+        self.check_comment_interval(input.author_id, input.post_id, input.clock_offset_ms).await?;
 
         // 3. 开启事务（带超时）
         let mut tx = tokio::time::timeout(
@@ -174,33 +215,7 @@ impl CommentService {
 
         // 6. 如果是二级回复，检查父评论状态
         if let Some(parent_id) = input.parent_comment_id {
-            let parent_status = sqlx::query_as::<Postgres, (Option<i64>, Option<DateTime<Utc>>)>(
-                r#"SELECT parent_comment_id, deleted_at FROM comments WHERE id = $1 FOR UPDATE NOWAIT"#
-            )
-            .bind(parent_id)
-            .fetch_optional(tx.as_mut())
-            .await;
-            
-            match parent_status {
-                Ok(Some((parent_comment_id, deleted_at))) => {
-                    // 检查父评论是否已删除
-                    if deleted_at.is_some() { 
-                        return Err(DomainError::Gone); // 父评论已删除，不能回复
-                    }
-                    // 检查是否超过最大楼层深度（只允许二层）
-                    if parent_comment_id.is_some() { 
-                        return Err(DomainError::Validation("超过最大楼层深度，只支持二层评论".into())); 
-                    }
-                }
-                Ok(None) => return Err(DomainError::NotFound), // 父评论不存在
-                Err(e) => {
-                    let err_msg = e.to_string();
-                    if err_msg.contains("could not obtain lock") {
-                        return Err(DomainError::Locked); // 父评论正在被操作（可能正在删除）
-                    }
-                    return Err(DomainError::Db(err_msg));
-                }
-            }
+            self.check_parent_tx(&mut tx, parent_id).await?;
         }
 
         // 7. 幂等插入评论（只有在帖子未删除时才能插入）
@@ -559,21 +574,48 @@ impl CommentService {
         Ok(())
     }
 
-    // 批量评论：一次插入多条（满足存在post且未删）
-    pub async fn batch_create_comments(&self, inputs: Vec<CreateCommentInput>) -> Result<Vec<CommentRow>, DomainError> {
-        if inputs.is_empty() { return Ok(vec![]); }
+    // 批量评论：同一帖子下的多条评论在一个事务内插入（一次 BEGIN/COMMIT）
+    // 条目可通过 parent_index 回复本批次中前面创建的一级评论；不做评论间隔检查，只供测试搭建数据
+    #[cfg(feature = "test-hooks")]
+    pub async fn batch_create_comments(&self, items: Vec<BatchCommentInput>) -> Result<Vec<CommentRow>, DomainError> {
+        if items.is_empty() { return Ok(vec![]); }
+        let post_id = items[0].input.post_id;
+        if items.iter().any(|i| i.input.post_id != post_id) {
+            return Err(DomainError::Validation("批量评论必须属于同一帖子".into()));
+        }
         // 速率限制：对每个作者简单校验（可优化为分组一次校验）
-        for i in &inputs {
-            let ok_user = self.limiter.check_and_consume(&format!("u:{}:comment", i.author_id), 20, 10).await.map_err(|e| DomainError::Db(e.to_string()))?;
+        for i in &items {
+            let ok_user = self.limiter.check_and_consume(&format!("u:{}:comment", i.input.author_id), 20, 10).await.map_err(|e| DomainError::Db(e.to_string()))?;
             if !ok_user { return Err(DomainError::TooManyRequests); }
         }
 
         let mut tx = self.pool.begin().await.map_err(|e| DomainError::Db(e.to_string()))?;
-        // 顾问锁：以首个post_id为例（生产可按分桶）
-        self.advisory_lock_tx(&mut tx, inputs[0].post_id).await?;
+        self.advisory_lock_tx(&mut tx, post_id).await?;
+
+        let (locked_at, deleted_at) = self.load_post_for_update(&mut tx, post_id).await?;
+        if deleted_at.is_some() { return Err(DomainError::Gone); }
+        if locked_at.is_some() { return Err(DomainError::Locked); }
+
+        let mut rows: Vec<CommentRow> = Vec::with_capacity(items.len());
+        for BatchCommentInput { input: i, parent_index } in items {
+            let parent_comment_id = match parent_index {
+                Some(idx) => {
+                    let parent = rows.get(idx).ok_or_else(|| {
+                        DomainError::Validation("parent_index 必须指向本批次中前面的条目".into())
+                    })?;
+                    if parent.parent_comment_id.is_some() {
+                        return Err(DomainError::Validation("超过最大楼层深度，只支持二层评论".into()));
+                    }
+                    Some(parent.id)
+                }
+                None => {
+                    if let Some(parent_id) = i.parent_comment_id {
+                        self.check_parent_tx(&mut tx, parent_id).await?;
+                    }
+                    i.parent_comment_id
+                }
+            };
 
-        let mut rows = Vec::with_capacity(inputs.len());
-        for i in inputs {
             let row = sqlx::query_as::<Postgres, CommentRow>(
                 r#"INSERT INTO comments (post_id, author_id, parent_comment_id, content, at_user_id, idempotency_key)
                    SELECT $1, $2, $3, $4, $5, $6
@@ -584,19 +626,20 @@ impl CommentService {
             )
             .bind(i.post_id)
             .bind(i.author_id)
-            .bind(i.parent_comment_id)
+            .bind(parent_comment_id)
             .bind(i.content)
             .bind(i.at_user_id)
             .bind(i.idempotency_key)
-            .fetch_one(tx.as_mut())
+            .fetch_optional(tx.as_mut())
             .await
-            .map_err(|e| DomainError::Db(e.to_string()))?;
+            .map_err(|e| DomainError::Db(e.to_string()))?
+            .ok_or(DomainError::Gone)?;
             rows.push(row);
         }
 
         // 事件通知（仅发送post_id）
         sqlx::query::<Postgres>("SELECT pg_notify('events', $1)")
-            .bind(format!(r#"{{"type":"batch_comment","post_id":{}}}"#, rows.first().map(|r| r.post_id).unwrap_or_default()))
+            .bind(format!(r#"{{"type":"batch_comment","post_id":{}}}"#, post_id))
             .execute(tx.as_mut())
             .await
             .map_err(|e| DomainError::Db(e.to_string()))?;
@@ -605,6 +648,48 @@ impl CommentService {
         Ok(rows)
     }
 
+    // 测试钩子：一条语句写入一个已软删除的帖子（不存在则插入，已存在则标记删除），返回帖子ID
+    #[cfg(feature = "test-hooks")]
+    pub async fn seed_deleted_post(&self, post_id: i64) -> Result<i64, DomainError> {
+        sqlx::query_scalar::<Postgres, i64>(
+            r#"INSERT INTO posts (id, author_id, deleted_at) VALUES ($1, 0, NOW())
+               ON CONFLICT (id) DO UPDATE SET deleted_at = COALESCE(posts.deleted_at, NOW()), updated_at = NOW()
+               RETURNING id"#
+        )
+        .bind(post_id)
+        .fetch_one(&self.pool)
+        .await
+        .map_err(|e| DomainError::Db(e.to_string()))
+    }
+
+    // 测试钩子：一条语句批量写入正常帖子；已存在的帖子恢复为未删除、未锁定，返回写入条数
+    #[cfg(feature = "test-hooks")]
+    pub async fn seed_posts(&self, post_ids: &[i64]) -> Result<u64, DomainError> {
+        let res = sqlx::query::<Postgres>(
+            r#"INSERT INTO posts (id, author_id) SELECT UNNEST($1::BIGINT[]), 0
+               ON CONFLICT (id) DO UPDATE SET deleted_at = NULL, locked_at = NULL, updated_at = NOW()"#
+        )
+        .bind(post_ids)
+        .execute(&self.pool)
+        .await
+        .map_err(|e| DomainError::Db(e.to_string()))?;
+        Ok(res.rows_affected())
+    }
+
+    // 测试钩子：一条语句软删除一批测试帖子（已删除的跳过），返回删除条数
+    #[cfg(feature = "test-hooks")]
+    pub async fn purge_posts(&self, post_ids: &[i64]) -> Result<u64, DomainError> {
+        let res = sqlx::query::<Postgres>(
+            r#"UPDATE posts SET deleted_at = NOW(), updated_at = NOW()
+               WHERE id = ANY($1) AND deleted_at IS NULL"#
+        )
+        .bind(post_ids)
+        .execute(&self.pool)
+        .await
+        .map_err(|e| DomainError::Db(e.to_string()))?;
+        Ok(res.rows_affected())
+    }
+
     // 检查帖子状态（用于前端验证帖子是否存在）
     pub async fn check_post_status(&self, post_id: i64) -> Result<PostStatus, DomainError> {
         let result = sqlx::query_as::<Postgres, (Option<DateTime<Utc>>, Option<DateTime<Utc>>)>(
@@ -630,7 +715,7 @@ impl CommentService {
     }
 
     // 获取帖子的评论树（一级评论 + 二级回复）
-    // 按最新时间排序（降序，最新的在前面）
+    // 按最新时间排序（降序，最新的在前面）；同一时间（如同一事务批量插入）按 id 降序，顺序确定
     pub async fn get_comments_tree(&self, post_id: i64) -> Result<Vec<(CommentRow, Vec<CommentRow>)>, DomainError> {
         // 获取所有一级评论（parent_comment_id IS NULL）
         // 按创建时间降序排列，最新的在前面
@@ -638,7 +723,7 @@ impl CommentService {
             r#"SELECT id, post_id, author_id, parent_comment_id, content, at_user_id, deleted_at, created_at
                FROM comments
                WHERE post_id = $1 AND parent_comment_id IS NULL AND deleted_at IS NULL
-               ORDER BY created_at DESC"#
+               ORDER BY created_at DESC, id DESC"#
         )
         .bind(post_id)
         .fetch_all(&self.pool)
@@ -655,7 +740,7 @@ impl CommentService {
             r#"SELECT id, post_id, author_id, parent_comment_id, content, at_user_id, deleted_at, created_at
                FROM comments
                WHERE post_id = $1 AND parent_comment_id = ANY($2) AND deleted_at IS NULL
-               ORDER BY created_at DESC"#
+               ORDER BY created_at DESC, id DESC"#
         )
         .bind(post_id)
         .bind(&parent_ids)
@@ -15,6 +15,7 @@ mod comments;
 use uuid::Uuid;
 use axum::{routing::{get, post, delete}, Router, Json, extract::{Path, State, Query}};
 use axum::http::{HeaderMap, StatusCode};
+use axum::response::{IntoResponse, Response};
 use jsonwebtoken::{encode, decode, Header as JwtHeader, EncodingKey, DecodingKey, Validation};
 use utoipa::{OpenApi, ToSchema};
 use utoipa_swagger_ui::SwaggerUi;
@@ -591,6 +592,28 @@ struct CommentReply {
     created_at: String,
 }
 
+// 评论列表的精简投影（?fields=id,created_at,reply_count），只需计数/排序的调用方不必传输正文
+#[derive(serde::Serialize, ToSchema)]
+struct CommentSummary {
+    id: i64,
+    created_at: String,
+    reply_count: usize,
+}
+
+#[derive(serde::Serialize, ToSchema)]
+struct CommentsSummaryEnvelope {
+    code: i32,
+    message: String,
+    data: Vec<CommentSummary>,
+}
+
+#[derive(serde::Deserialize)]
+struct CommentsFieldsQuery {
+    fields: Option<String>,
+}
+
+const COMMENT_SUMMARY_FIELDS: [&str; 3] = ["id", "created_at", "reply_count"];
+
 #[derive(serde::Serialize, ToSchema)]
 struct CommentEnvelope {
     code: i32,
@@ -635,6 +658,21 @@ struct AppState {
     comment_service: Option<Arc<comments::CommentService>>,
 }
 
+// 测试钩子：仅当 ALLOW_TEST_CLOCK_OFFSET=true 时读取 X-Test-Clock-Offset（毫秒），
+// 让测试跳过连续评论间隔的真实等待；未开启时始终返回 0
+fn test_clock_offset_ms(headers: &HeaderMap) -> i64 {
+    let enabled = std::env::var("ALLOW_TEST_CLOCK_OFFSET").map(|v| v == "1" || v.eq_ignore_ascii_case("true")).unwrap_or(false);
+    if !enabled {
+        return 0;
+    }
+    headers
+        .get("x-test-clock-offset")
+        .and_then(|v| v.to_str().ok())
+        .and_then(|v| v.trim().parse::<i64>().ok())
+        .map(|ms| ms.clamp(-86_400_000, 86_400_000)) // 限制在 ±1 天内，避免时间运算溢出
+        .unwrap_or(0)
+}
+
 #[utoipa::path(
     post,
     path = "/api/comments",
@@ -681,6 +719,7 @@ async fn create_comment_handler(
         at_user_id: req.at_user_id,
         idempotency_key: req.idempotency_key,
         ip_key,
+        clock_offset_ms: test_clock_offset_ms(&headers),
     };
 
     match service.create_comment(input).await {
@@ -711,6 +750,210 @@ async fn create_comment_handler(
     }
 }
 
+// ==================== 测试钩子（仅 test-hooks 特性构建）====================
+
+#[cfg(feature = "test-hooks")]
+#[derive(serde::Deserialize)]
+struct SeedDeletedPostRequest {
+    post_id: i64,
+}
+
+#[cfg(feature = "test-hooks")]
+#[derive(serde::Serialize)]
+struct SeedPostEnvelope {
+    code: i32,
+    message: String,
+    post_id: i64,
+}
+
+// 一次调用写入一个已删除的帖子，替代测试里“创建评论 → 删除帖子”的多次往返
+#[cfg(feature = "test-hooks")]
+async fn seed_deleted_post_handler(
+    State(state): State<AppState>,
+    headers: HeaderMap,
+    Query(auth): Query<AuthQueryComment>,
+    Json(req): Json<SeedDeletedPostRequest>,
+) -> Result<Json<SeedPostEnvelope>, (StatusCode, Json<ApiErrorEnvelope>)> {
+    if !verify_auth(&headers, &auth.ts, &auth.nonce, &auth.uid_hash, &auth.sig, &format!("post_id={}&ts={}&nonce={}&uid_hash={}", req.post_id, auth.ts, auth.nonce, auth.uid_hash)).await {
+        return Err((StatusCode::UNAUTHORIZED, Json(ApiErrorEnvelope { code: 401, message: "invalid auth".into() })));
+    }
+
+    let service = state.comment_service.as_ref().ok_or_else(|| {
+        (StatusCode::SERVICE_UNAVAILABLE, Json(ApiErrorEnvelope { code: 503, message: "comment service not available".into() }))
+    })?;
+
+    match service.seed_deleted_post(req.post_id).await {
+        Ok(post_id) => Ok(Json(SeedPostEnvelope { code: 0, message: "ok".into(), post_id })),
+        Err(e) => Err((StatusCode::INTERNAL_SERVER_ERROR, Json(ApiErrorEnvelope { code: e.code() as i32, message: e.to_string() }))),
+    }
+}
+
+#[cfg(feature = "test-hooks")]
+#[derive(serde::Deserialize)]
+struct SeedPostsRequest {
+    post_ids: Vec<i64>,
+}
+
+#[cfg(feature = "test-hooks")]
+#[derive(serde::Serialize)]
+struct SeedPostsEnvelope {
+    code: i32,
+    message: String,
+    affected: u64,
+}
+
+// 批量写入 / 软删除测试帖子，测试会话开始和结束时各一次往返
+#[cfg(feature = "test-hooks")]
+async fn seed_posts_handler(
+    State(state): State<AppState>,
+    headers: HeaderMap,
+    Query(auth): Query<AuthQueryComment>,
+    Json(req): Json<SeedPostsRequest>,
+) -> Result<Json<SeedPostsEnvelope>, (StatusCode, Json<ApiErrorEnvelope>)> {
+    let service = test_hook_service(&state, &headers, &auth, &req).await?;
+    match service.seed_posts(&req.post_ids).await {
+        Ok(affected) => Ok(Json(SeedPostsEnvelope { code: 0, message: "ok".into(), affected })),
+        Err(e) => Err((StatusCode::INTERNAL_SERVER_ERROR, Json(ApiErrorEnvelope { code: e.code() as i32, message: e.to_string() }))),
+    }
+}
+
+#[cfg(feature = "test-hooks")]
+async fn purge_posts_handler(
+    State(state): State<AppState>,
+    headers: HeaderMap,
+    Query(auth): Query<AuthQueryComment>,
+    Json(req): Json<SeedPostsRequest>,
+) -> Result<Json<SeedPostsEnvelope>, (StatusCode, Json<ApiErrorEnvelope>)> {
+    let service = test_hook_service(&state, &headers, &auth, &req).await?;
+    match service.purge_posts(&req.post_ids).await {
+        Ok(affected) => Ok(Json(SeedPostsEnvelope { code: 0, message: "ok".into(), affected })),
+        Err(e) => Err((StatusCode::INTERNAL_SERVER_ERROR, Json(ApiErrorEnvelope { code: e.code() as i32, message: e.to_string() }))),
+    }
+}
+
+#[cfg(feature = "test-hooks")]
+#[derive(serde::Serialize, serde::Deserialize)]
+struct BulkCommentItem {
+    post_id: i64,
+    author_id: i64,
+    content: String,
+    parent_comment_id: Option<i64>,
+    parent_index: Option<usize>, // 回复本批次中第 parent_index 条（从 0 开始）一级评论
+    at_user_id: Option<i64>,
+    idempotency_key: String,
+}
+
+#[cfg(feature = "test-hooks")]
+#[derive(serde::Serialize, serde::Deserialize)]
+struct BulkCreateCommentsRequest {
+    items: Vec<BulkCommentItem>,
+}
+
+#[cfg(feature = "test-hooks")]
+#[derive(serde::Serialize)]
+struct BulkCommentResult {
+    client_index: usize,
+    id: i64,
+    post_id: i64,
+    author_id: i64,
+    parent_comment_id: Option<i64>,
+    content: String,
+    at_user_id: Option<i64>,
+    created_at: String,
+}
+
+#[cfg(feature = "test-hooks")]
+#[derive(serde::Serialize)]
+struct BulkCommentsEnvelope {
+    code: i32,
+    message: String,
+    data: Vec<BulkCommentResult>,
+}
+
+// 一个请求 / 一个事务内批量创建同一帖子下的评论，用于测试快速搭建评论树；
+// 不做评论间隔与 IP 限流、签名也只覆盖条目数，因此不进入默认构建
+#[cfg(feature = "test-hooks")]
+async fn bulk_create_comments_handler(
+    State(state): State<AppState>,
+    headers: HeaderMap,
+    Query(auth): Query<AuthQueryComment>,
+    Json(req): Json<BulkCreateCommentsRequest>,
+) -> Result<Json<BulkCommentsEnvelope>, (StatusCode, Json<ApiErrorEnvelope>)> {
+    // 验证认证：签名覆盖帖子与条目数
+    let post_id = req.items.first().map(|i| i.post_id).unwrap_or(0);
+    if !verify_auth(&headers, &auth.ts, &auth.nonce, &auth.uid_hash, &auth.sig, &format!("count={}&post_id={}&ts={}&nonce={}&uid_hash={}", req.items.len(), post_id, auth.ts, auth.nonce, auth.uid_hash)).await {
+        return Err((StatusCode::UNAUTHORIZED, Json(ApiErrorEnvelope { code: 401, message: "invalid auth".into() })));
+    }
+
+    let service = state.comment_service.as_ref().ok_or_else(|| {
+        (StatusCode::SERVICE_UNAVAILABLE, Json(ApiErrorEnvelope { code: 503, message: "comment service not available".into() }))
+    })?;
+
+    let ip_key = headers
+        .get("x-forwarded-for")
+        .and_then(|v| v.to_str().ok())
+        .unwrap_or("unknown")
+        .to_string();
+
+    let inputs = req.items.into_iter().map(|i| comments::BatchCommentInput {
+        input: comments::CreateCommentInput {
+            post_id: i.post_id,
+            author_id: i.author_id,
+            parent_comment_id: i.parent_comment_id,
+            content: i.content,
+            at_user_id: i.at_user_id,
+            idempotency_key: i.idempotency_key,
+            ip_key: ip_key.clone(),
+            clock_offset_ms: 0,
+        },
+        parent_index: i.parent_index,
+    }).collect();
+
+    match service.batch_create_comments(inputs).await {
+        Ok(rows) => {
+            let data = rows.into_iter().enumerate().map(|(client_index, c)| BulkCommentResult {
+                client_index,
+                id: c.id,
+                post_id: c.post_id,
+                author_id: c.author_id,
+                parent_comment_id: c.parent_comment_id,
+                content: c.content,
+                at_user_id: c.at_user_id,
+                created_at: c.created_at.to_rfc3339(),
+            }).collect();
+            Ok(Json(BulkCommentsEnvelope { code: 0, message: "批量评论创建成功".into(), data }))
+        }
+        Err(e) => {
+            let status = match e.code() {
+                404 => StatusCode::NOT_FOUND,
+                410 => StatusCode::GONE,
+                423 => StatusCode::LOCKED,
+                429 => StatusCode::TOO_MANY_REQUESTS,
+                422 => StatusCode::UNPROCESSABLE_ENTITY,
+                408 => StatusCode::REQUEST_TIMEOUT,
+                _ => StatusCode::INTERNAL_SERVER_ERROR,
+            };
+            Err((status, Json(ApiErrorEnvelope { code: e.code() as i32, message: e.to_string() })))
+        }
+    }
+}
+
+// 批量帖子测试钩子的公共部分：签名覆盖条目数，并取出评论服务
+#[cfg(feature = "test-hooks")]
+async fn test_hook_service<'a>(
+    state: &'a AppState,
+    headers: &HeaderMap,
+    auth: &AuthQueryComment,
+    req: &SeedPostsRequest,
+) -> Result<&'a Arc<comments::CommentService>, (StatusCode, Json<ApiErrorEnvelope>)> {
+    if !verify_auth(headers, &auth.ts, &auth.nonce, &auth.uid_hash, &auth.sig, &format!("count={}&ts={}&nonce={}&uid_hash={}", req.post_ids.len(), auth.ts, auth.nonce, auth.uid_hash)).await {
+        return Err((StatusCode::UNAUTHORIZED, Json(ApiErrorEnvelope { code: 401, message: "invalid auth".into() })));
+    }
+    state.comment_service.as_ref().ok_or_else(|| {
+        (StatusCode::SERVICE_UNAVAILABLE, Json(ApiErrorEnvelope { code: 503, message: "comment service not available".into() }))
+    })
+}
+
 #[utoipa::path(
     get,
     path = "/api/posts/{post_id}/status",
@@ -792,6 +1035,7 @@ async fn check_post_status_handler(
     path = "/api/posts/{post_id}/comments",
     params(
         ("post_id" = i64, Path, description = "帖子 ID"),
+        ("fields" = Option<String>, Query, description = "可选，id,created_at,reply_count 的子集；传入时返回精简列表 CommentsSummaryEnvelope"),
         ("ts" = u64, Query, description = "时间戳（签名参与）"),
         ("nonce" = String, Query, description = "随机数（签名参与）"),
         ("uid_hash" = String, Query, description = "用户唯一哈希，36 位字母数字（签名参与）"),
@@ -800,6 +1044,7 @@ async fn check_post_status_handler(
     responses(
         (status = 200, description = "评论列表（嵌套结构）", body = CommentsListEnvelope),
         (status = 401, description = "未授权", body = ApiErrorEnvelope),
+        (status = 422, description = "fields 含不支持的字段", body = ApiErrorEnvelope),
         (status = 404, description = "帖子不存在", body = ApiErrorEnvelope),
         (status = 410, description = "帖子已删除", body = ApiErrorEnvelope)
     )
@@ -809,12 +1054,23 @@ async fn get_comments_handler(
     headers: HeaderMap,
     Path(post_id): Path<i64>,
     Query(auth): Query<AuthQueryComment>,
-) -> Result<Json<CommentsListEnvelope>, (StatusCode, Json<ApiErrorEnvelope>)> {
+    Query(projection): Query<CommentsFieldsQuery>,
+) -> Result<Response, (StatusCode, Json<ApiErrorEnvelope>)> {
     // 验证认证
     if !verify_auth(&headers, &auth.ts, &auth.nonce, &auth.uid_hash, &auth.sig, &format!("post_id={}&ts={}&nonce={}&uid_hash={}", post_id, auth.ts, auth.nonce, auth.uid_hash)).await {
         return Err((StatusCode::UNAUTHORIZED, Json(ApiErrorEnvelope { code: 401, message: "invalid auth".into() })));
     }
 
+    let summary = match projection.fields.as_deref() {
+        None => false,
+        Some(fields) => {
+            if !fields.split(',').all(|f| COMMENT_SUMMARY_FIELDS.contains(&f.trim())) {
+                return Err((StatusCode::UNPROCESSABLE_ENTITY, Json(ApiErrorEnvelope { code: 422, message: format!("fields 仅支持 {}", COMMENT_SUMMARY_FIELDS.join(",")) })));
+            }
+            true
+        }
+    };
+
     let service = state.comment_service.as_ref().ok_or_else(|| {
         (StatusCode::SERVICE_UNAVAILABLE, Json(ApiErrorEnvelope { code: 503, message: "comment service not available".into() }))
     })?;
@@ -835,6 +1091,14 @@ async fn get_comments_handler(
     }
 
     match service.get_comments_tree(post_id).await {
+        Ok(tree) if summary => {
+            let data: Vec<CommentSummary> = tree.into_iter().map(|(parent, replies)| CommentSummary {
+                id: parent.id,
+                created_at: parent.created_at.to_rfc3339(),
+                reply_count: replies.len(),
+            }).collect();
+            Ok(Json(CommentsSummaryEnvelope { code: 0, message: "ok".into(), data }).into_response())
+        }
         Ok(tree) => {
             let nested_comments: Vec<CommentWithReplies> = tree.into_iter().map(|(parent, replies)| {
                 CommentWithReplies {
@@ -854,7 +1118,7 @@ async fn get_comments_handler(
                 }
             }).collect();
             
-            Ok(Json(CommentsListEnvelope { code: 0, message: "ok".into(), data: nested_comments }))
+            Ok(Json(CommentsListEnvelope { code: 0, message: "ok".into(), data: nested_comments }).into_response())
         }
         Err(e) => {
             let status = match e.code() {
@@ -1059,6 +1323,7 @@ async fn verify_auth(headers: &HeaderMap, ts: &u64, nonce: &str, uid_hash: &str,
             SocialActionRequest, SocialActionEnvelope, AuthQueryAction,
             CreateCommentRequest, CommentResponse, CommentEnvelope, AuthQueryComment,
             CommentWithReplies, CommentReply, CommentsListEnvelope,
+            CommentSummary, CommentsSummaryEnvelope,
             PostStatusResponse, PostStatusEnvelope,
             ReactRequest
         )
@@ -1247,6 +1512,12 @@ async fn main() -> Result<(), Box<dyn std::error::Error>> {
         .route("/api/posts/:post_id", delete(delete_post_handler))
         .route("/api/reactions", post(react_handler))
         .merge(SwaggerUi::new("/swagger-ui").url("/api-docs/openapi.json", ApiDoc::openapi()));
+    #[cfg(feature = "test-hooks")]
+    let http_app = http_app
+        .route("/api/test/seed_deleted_post", post(seed_deleted_post_handler))
+        .route("/api/test/seed_posts", post(seed_posts_handler))
+        .route("/api/test/purge_posts", post(purge_posts_handler))
+        .route("/api/comments/bulk", post(bulk_create_comments_handler));
     let http_app = http_app.with_state(app_state);
     info!("HTTP Swagger UI listening on: http://{}{}", http_addr, "/swagger-ui/");
     tokio::spawn(async move {
@@ -0,0 +1,131 @@
+"""
+测试公共配置：会话级服务、客户端与帖子 fixture，以及终端汇总钩子
+"""
+
+import itertools
+import os
+import secrets
+import subprocess
+import sys
+
+import pytest
+import pytest_asyncio
+import requests
+
+# 让 tests/ 下的 helpers 在任何 --import-mode 下都可导入
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from helpers import BASE_URL, make_async_client, make_client, make_session, wait_until  # noqa: E402
+
+
+def _server_up() -> bool:
+    try:
+        return requests.get(f"{BASE_URL}/health", timeout=0.5).ok
+    except requests.RequestException:
+        return False
+
+
+# 本次运行收集到的、定义了 SUMMARY 的测试模块：nodeid 路径 -> SUMMARY 文本
+_module_summaries: dict = {}
+
+
+def pytest_collection_modifyitems(items):
+    for item in items:
+        summary = getattr(getattr(item, "module", None), "SUMMARY", None)
+        if summary:
+            _module_summaries.setdefault(item.nodeid.split("::")[0], summary)
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    """pytest -v 时在终端汇总区输出各测试模块的 SUMMARY；模块内有失败的测试则不输出"""
+    if config.getoption("verbose") <= 0 or not _module_summaries:
+        return
+    failed = {r.nodeid.split("::")[0] for r in terminalreporter.stats.get("failed", [])}
+    terminalreporter.write_sep("=", "测试总结")
+    for path, summary in _module_summaries.items():
+        if path not in failed:
+            terminalreporter.write_line(path)
+            terminalreporter.write_line(summary)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def rust_server():
+    """整个测试会话只启动一次 Rust 服务
+    
+    设置 RUST_SERVER_BIN（以 --features test-hooks 构建的可执行文件路径）时由这里启动并在会话结束时关闭，
+    同时打开测试钩子开关；未设置或服务已在运行时沿用外部服务。
+    pytest-xdist 的每个 worker 各自是一个会话、会争用同一端口，并行运行时请先在外部启动服务
+    """
+    binary = os.environ.get("RUST_SERVER_BIN")
+    if not binary or _server_up():
+        yield None
+        return
+    env = {**os.environ, "ALLOW_TEST_CLOCK_OFFSET": "true"}
+    proc = subprocess.Popen([binary], env=env)
+    try:
+        if not wait_until(_server_up, timeout=30.0, interval=0.1):
+            pytest.exit(f"Rust 服务未能在 30 秒内就绪: {binary}", returncode=1)
+        yield proc
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+
+
+@pytest.fixture(scope="session")
+def http_session():
+    """整个测试会话共享一个连接池，省去每个请求的 TCP 握手"""
+    session = make_session()
+    yield session
+    session.close()
+
+
+@pytest.fixture(scope="session")
+def client(http_session):
+    return make_client(http_session)
+
+
+@pytest.fixture(scope="session")
+def post_id_pool(client):
+    """本会话专用的帖子 ID 发号器，测试各取新 ID，互不污染
+    
+    起点随机落在一个很大的区间里，不同次运行、不同 xdist worker 不会拿到同一批 ID；
+    会话结束时一次性软删除发出去的全部 ID
+    """
+    start = 10**12 + secrets.randbelow(10**6) * 10**4
+    pool = itertools.count(start)
+    yield pool
+    client.purge_posts(list(range(start, next(pool))))
+
+
+@pytest.fixture(scope="session")
+def seeded_posts(client, post_id_pool):
+    """按名字分配并一次性写入测试用的正常帖子，整个会话只需一次往返"""
+    names = ["status_normal", "status_flow", "comments"]
+    posts = {name: next(post_id_pool) for name in names}
+    assert client.seed_posts(list(posts.values()))
+    return posts
+
+
+@pytest.fixture
+def fresh_post(client, post_id_pool) -> int:
+    """单个测试独占的新帖子：场景之间不共享状态，pytest --lf 可以只重跑失败的场景"""
+    post_id = next(post_id_pool)
+    assert client.seed_posts([post_id])
+    return post_id
+
+
+@pytest.fixture(autouse=True)
+def _comments_cache_per_test(request):
+    """评论缓存只在单个测试内有效，避免跨测试读到其他测试阶段的结果"""
+    if "client" in request.fixturenames:
+        request.getfixturevalue("client").clear_comments_cache()
+
+
+@pytest_asyncio.fixture
+async def async_client():
+    async with make_async_client() as client:
+        yield client
@@ -0,0 +1,195 @@
+"""
+测试辅助函数与测试专用客户端
+
+普通模块而非 conftest：测试文件直接 from helpers import ...，在 --import-mode=importlib 下同样可用。
+examples/ 下的客户端类也经由这里导出，测试文件不必依赖导入顺序即可直接运行（python tests/test_xxx.py）
+"""
+
+import os
+import secrets
+import sys
+import threading
+import time
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# 测试脚本直接 import examples/ 下的客户端
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "examples"))
+
+from python_client_example import AsyncRustChatClient, RustChatClient  # noqa: E402
+
+BASE_URL = "http://127.0.0.1:8081"
+AUTH_SECRET = "sso-secret"  # 与 Rust 服务的 AUTH_SECRET 保持一致
+
+
+def wait_until(predicate, timeout: float = 2.0, interval: float = 0.02):
+    """轮询直到 predicate() 为真或超时，返回最后一次的结果
+
+    用于替代写操作后固定的 time.sleep：条件满足立即返回，不再白等
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        result = predicate()
+        if result or time.monotonic() >= deadline:
+            return result
+        time.sleep(interval)  # noqa: SLEEP-OK 轮询间隔
+
+
+def build_comment_batch(n: int, post_id: int, base_author: int = 1000,
+                        content_prefix: str = "c", parent_index: Optional[int] = None) -> list:
+    """生成 n 条批量评论条目（作者ID依次递增，内容为 前缀+序号），直接交给 create_comments_bulk"""
+    extra = {} if parent_index is None else {"parent_index": parent_index}
+    return [
+        {"post_id": post_id, "author_id": author_id, "content": f"{content_prefix}{i}", **extra}
+        for i, author_id in enumerate(range(base_author, base_author + n), 1)
+    ]
+
+
+def _with_comment(tree: list, comment: dict) -> list:
+    """返回插入新评论后的评论树副本（最新的在前面），不修改原列表"""
+    parent_id = comment.get("parent_comment_id")
+    if parent_id is None:
+        entry = {k: comment[k] for k in ("id", "post_id", "author_id", "content", "at_user_id", "created_at")}
+        entry["replies"] = []
+        return [entry] + tree
+    reply = {k: comment[k] for k in ("id", "author_id", "content", "at_user_id", "created_at")}
+    return [
+        {**c, "replies": [reply] + c.get("replies", [])} if c["id"] == parent_id else c
+        for c in tree
+    ]
+
+
+class CachedRustChatClient(RustChatClient):
+    """测试专用客户端：同一测试阶段内缓存 get_comments，写操作时更新或失效
+
+    创建评论成功后直接把返回的评论写入已缓存的评论树，紧随其后的校验读取不再发请求；
+    删除评论 / 帖子则使缓存失效，下一次读取回源
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._comments_cache: dict = {}
+        self._comments_lock = threading.Lock()
+        self._url_seed_deleted_post = f"{self.base_url}/api/test/seed_deleted_post"
+        self._url_seed_posts = f"{self.base_url}/api/test/seed_posts"
+        self._url_purge_posts = f"{self.base_url}/api/test/purge_posts"
+        self._url_comments_bulk = f"{self.base_url}/api/comments/bulk"
+    
+    def clear_comments_cache(self):
+        with self._comments_lock:
+            self._comments_cache.clear()
+    
+    def get_comments(self, post_id: int, fresh: bool = False) -> list:
+        """fresh=True 时跳过缓存直接回源（供 wait_until 轮询使用），结果仍写回缓存"""
+        if not fresh:
+            with self._comments_lock:
+                cached = self._comments_cache.get(post_id)
+            if cached is not None:
+                return cached
+        comments = super().get_comments(post_id)
+        with self._comments_lock:
+            self._comments_cache[post_id] = comments
+        return comments
+    
+    def create_comment(self, post_id: int, author_id: int, content: str,
+                       parent_comment_id: Optional[int] = None,
+                       at_user_id: Optional[int] = None,
+                       headers: Optional[dict] = None) -> Optional[dict]:
+        comment = super().create_comment(post_id, author_id, content, parent_comment_id, at_user_id, headers)
+        with self._comments_lock:
+            cached = self._comments_cache.pop(post_id, None)
+            if comment and cached is not None:
+                self._comments_cache[post_id] = _with_comment(cached, comment)
+        return comment
+    
+    def create_comments_bulk(self, items: list) -> list:
+        """在一个请求 / 一个事务内批量创建同一帖子下的评论（需 test-hooks 构建）
+        
+        items 每项包含 post_id、author_id、content，可选 parent_comment_id、at_user_id，
+        或用 parent_index 回复本批次中前面的一级评论（下标从 0 开始）；
+        按请求顺序返回创建的评论（含 client_index 与 id），失败返回空列表
+        """
+        post_id = items[0]["post_id"] if items else 0
+        auth_params = self._get_auth_params(post_id=post_id, count=len(items))
+        body = self._json({"items": [{"idempotency_key": secrets.token_hex(16), **item} for item in items]})
+        try:
+            ok, result = self._call("POST", self._url_comments_bulk, auth_params, body)
+        finally:
+            self._invalidate_post(post_id)
+            with self._comments_lock:
+                self._comments_cache.pop(post_id, None)
+        return result.get("data", []) if self._log_result(ok, result, "批量评论创建") else []
+    
+    def delete_comment(self, comment_id: int) -> bool:
+        try:
+            return super().delete_comment(comment_id)
+        finally:
+            # 不知道评论所属帖子，且一级评论会级联删除回复，直接清空
+            self.clear_comments_cache()
+    
+    def seed_deleted_post(self, post_id: int) -> bool:
+        """一次请求写入一个已删除的帖子（需服务端以 --features test-hooks 构建）"""
+        auth_params = self._get_auth_params(post_id=post_id)
+        try:
+            ok, result = self._call("POST", self._url_seed_deleted_post, auth_params,
+                                    self._json({"post_id": post_id}))
+        finally:
+            self._invalidate_post(post_id)
+            with self._comments_lock:
+                self._comments_cache.pop(post_id, None)
+        return self._log_result(ok, result, "播种已删除帖子")
+    
+    def _post_batch(self, url: str, post_ids: list, action: str) -> bool:
+        auth_params = self._get_auth_params(count=len(post_ids))
+        try:
+            ok, result = self._call("POST", url, auth_params, self._json({"post_ids": post_ids}))
+        finally:
+            with self._comments_lock:
+                for post_id in post_ids:
+                    self._invalidate_post(post_id)
+                    self._comments_cache.pop(post_id, None)
+        return self._log_result(ok, result, action)
+    
+    def seed_posts(self, post_ids: list) -> bool:
+        """一次请求写入一批正常帖子（需 test-hooks 构建）"""
+        return self._post_batch(self._url_seed_posts, post_ids, "播种帖子")
+    
+    def purge_posts(self, post_ids: list) -> bool:
+        """一次请求软删除一批测试帖子（需 test-hooks 构建）"""
+        return self._post_batch(self._url_purge_posts, post_ids, "清理帖子")
+    
+    def delete_post(self, post_id: int) -> bool:
+        try:
+            return super().delete_post(post_id)
+        finally:
+            with self._comments_lock:
+                self._comments_cache.pop(post_id, None)
+
+
+def make_session() -> requests.Session:
+    """创建 keep-alive 连接池；测试失败应立即暴露，不做重试"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16, max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def make_client(session: requests.Session = None) -> CachedRustChatClient:
+    """创建测试用客户端；关闭客户端自带的 TTL 读缓存，改用按写操作失效的测试缓存"""
+    return CachedRustChatClient(
+        base_url=BASE_URL,
+        auth_secret=AUTH_SECRET,
+        read_cache_ttl=0,
+        session=session or make_session()
+    )
+
+
+def make_async_client() -> AsyncRustChatClient:
+    """创建测试用异步客户端：keep-alive 连接池允许多个请求同时在途，配合 asyncio.gather 批量发出
+    
+    连接池在首次请求时于当前事件循环中创建，用 async with 关闭
+    """
+    return AsyncRustChatClient(base_url=BASE_URL, auth_secret=AUTH_SECRET, read_cache_ttl=0)
@@ -3,174 +3,167 @@
 测试嵌套评论结构：一级评论 + 二级回复 + @功能
 """
 
-from python_client_example import RustChatClient
-import time
+import asyncio
+import logging
+import sys
 
-def test_comments():
-    """测试评论功能"""
-    print("=" * 70)
-    print("评论功能测试")
-    print("=" * 70)
-    
-    # 创建客户端
-    client = RustChatClient(
-        base_url="http://127.0.0.1:8081",
-        auth_secret="sso-secret"
-    )
-    
-    # 测试帖子ID
-    post_id = 1
+import pytest
+
+from helpers import AsyncRustChatClient
+
+logger = logging.getLogger(__name__)
+
+
+# 数据结构说明（pytest -v 时由 conftest 在终端汇总区输出）
+SUMMARY = """
+    返回的评论树结构：
+    [
+        {
+            "id": 1,                    # 一级评论ID
+            "post_id": 1,               # 帖子ID
+            "author_id": 100,           # 作者ID
+            "content": "评论内容",       # 评论内容
+            "at_user_id": null,         # @的用户ID（一级评论通常为null）
+            "created_at": "2024-...",   # 创建时间
+            "replies": [                # 二级回复列表
+                {
+                    "id": 2,            # 回复ID
+                    "author_id": 102,   # 回复者ID
+                    "content": "回复内容",
+                    "at_user_id": 100,  # @的用户ID
+                    "created_at": "2024-..."
+                }
+            ]
+        }
+    ]
     
-    print(f"\n📝 测试帖子 ID: {post_id}")
-    print("-" * 70)
+    特点：
+    - 最多支持二层结构（一级评论 + 二级回复）
+    - 二级回复可以 @任何用户（通常是一级评论作者或帖子作者）
+    - 按创建时间升序排列
+    - 支持幂等性（相同的 idempotency_key 不会重复创建）
+    """
+
+
+async def _run_comments_test(client: AsyncRustChatClient, post_id: int):
+    """测试评论功能"""
+    logger.debug("评论功能测试")
     
-    # 1. 创建第一条一级评论
-    print("\n1️⃣  创建第一条一级评论（作者ID=100）")
-    comment1 = client.create_comment(
-        post_id=post_id,
-        author_id=100,
-        content="这是第一条一级评论，讨论一下这个话题"
-    )
-    time.sleep(0.5)
+    logger.debug("📝 测试帖子 ID: %s", post_id)
     
-    # 2. 创建第二条一级评论
-    print("\n2️⃣  创建第二条一级评论（作者ID=101）")
-    comment2 = client.create_comment(
-        post_id=post_id,
-        author_id=101,
-        content="我也来发表一下看法"
+    # 1-2. 并发创建两条一级评论（作者ID=100 / 101）
+    logger.debug("1️⃣  创建第一条一级评论（作者ID=100）")
+    logger.debug("2️⃣  创建第二条一级评论（作者ID=101）")
+    comment1, comment2 = await asyncio.gather(
+        client.create_comment(
+            post_id=post_id,
+            author_id=100,
+            content="这是第一条一级评论，讨论一下这个话题"
+        ),
+        client.create_comment(
+            post_id=post_id,
+            author_id=101,
+            content="我也来发表一下看法"
+        )
     )
-    time.sleep(0.5)
     
-    # 3. 回复第一条评论（不@）
+    # 3-6. 回复只依赖对应的一级评论，彼此独立，一次性并发发出
+    replies = []
     if comment1:
-        print("\n3️⃣  回复第一条评论（作者ID=102，不@）")
-        client.create_comment(
+        logger.debug("3️⃣  回复第一条评论（作者ID=102，不@）")
+        replies.append(client.create_comment(
             post_id=post_id,
             author_id=102,
             content="我同意你的观点",
             parent_comment_id=comment1["id"]
-        )
-        time.sleep(0.5)
-    
-    # 4. 回复第一条评论（@原作者）
-    if comment1:
-        print("\n4️⃣  回复第一条评论（作者ID=103，@原作者100）")
-        client.create_comment(
+        ))
+        
+        logger.debug("4️⃣  回复第一条评论（作者ID=103，@原作者100）")
+        replies.append(client.create_comment(
             post_id=post_id,
             author_id=103,
             content="@100 你说得对，我补充一点",
             parent_comment_id=comment1["id"],
             at_user_id=100
-        )
-        time.sleep(0.5)
+        ))
+        
+        logger.debug("6️⃣  再给第一条评论添加回复（作者ID=105）")
+        replies.append(client.create_comment(
+            post_id=post_id,
+            author_id=105,
+            content="我也有同样的想法",
+            parent_comment_id=comment1["id"]
+        ))
     
-    # 5. 回复第二条评论
     if comment2:
-        print("\n5️⃣  回复第二条评论（作者ID=104，@原作者101）")
-        client.create_comment(
+        logger.debug("5️⃣  回复第二条评论（作者ID=104，@原作者101）")
+        replies.append(client.create_comment(
             post_id=post_id,
             author_id=104,
             content="@101 能详细说说吗？",
             parent_comment_id=comment2["id"],
             at_user_id=101
-        )
-        time.sleep(0.5)
+        ))
     
-    # 6. 再给第一条评论添加一个回复
-    if comment1:
-        print("\n6️⃣  再给第一条评论添加回复（作者ID=105）")
-        client.create_comment(
-            post_id=post_id,
-            author_id=105,
-            content="我也有同样的想法",
-            parent_comment_id=comment1["id"]
-        )
-        time.sleep(0.5)
+    await asyncio.gather(*replies)
     
     # 7. 获取完整的评论树
-    print("\n" + "=" * 70)
-    print("📋 获取完整的评论树结构")
-    print("=" * 70)
+    logger.debug("📋 获取完整的评论树结构")
     
-    comments = client.get_comments(post_id)
+    comments = await client.get_comments(post_id)
     
     if comments:
-        print(f"\n共有 {len(comments)} 条一级评论\n")
+        logger.debug("共有 %s 条一级评论", len(comments))
         
         for i, comment in enumerate(comments, 1):
             # 显示一级评论
-            print(f"┌─ [{i}] 一级评论 (ID={comment['id']}, 作者={comment['author_id']})")
-            print(f"│   内容: {comment['content']}")
-            print(f"│   时间: {comment['created_at']}")
+            logger.debug("┌─ [%s] 一级评论 (ID=%s, 作者=%s)", i, comment['id'], comment['author_id'])
+            logger.debug("│   内容: %s", comment['content'])
+            logger.debug("│   时间: %s", comment['created_at'])
             
             # 显示二级回复
             replies = comment.get('replies', [])
             if replies:
-                print(f"│   └─ 共 {len(replies)} 条回复:")
+                logger.debug("│   └─ 共 %s 条回复:", len(replies))
                 for j, reply in enumerate(replies, 1):
                     at_info = f" @{reply['at_user_id']}" if reply.get('at_user_id') else ""
-                    print(f"│      ├─ [{j}] 回复 (ID={reply['id']}, 作者={reply['author_id']}{at_info})")
-                    print(f"│      │   内容: {reply['content']}")
-                    print(f"│      │   时间: {reply['created_at']}")
+                    logger.debug("│      ├─ [%s] 回复 (ID=%s, 作者=%s%s)", j, reply['id'], reply['author_id'], at_info)
+                    logger.debug("│      │   内容: %s", reply['content'])
+                    logger.debug("│      │   时间: %s", reply['created_at'])
             else:
-                print(f"│   └─ 暂无回复")
+                logger.debug("│   └─ 暂无回复")
             
-            print("│")
+            logger.debug("│")
         
-        print("└" + "─" * 68)
     else:
-        print("\n暂无评论")
+        logger.debug("暂无评论")
+    
+    # 校验最终的评论树结构
+    assert comment1 and comment2, "一级评论创建失败"
+    tree = {c['id']: c for c in comments}
+    assert len(tree[comment1['id']].get('replies', [])) >= 3
+    assert len(tree[comment2['id']].get('replies', [])) >= 1
     
     # 8. 测试点赞功能
-    print("\n" + "=" * 70)
-    print("👍 测试点赞功能")
-    print("=" * 70)
+    logger.debug("👍 测试点赞功能")
     
     if comment1:
-        print(f"\n给一级评论 {comment1['id']} 点赞")
-        client.add_reaction(
+        logger.debug("给一级评论 %s 点赞", comment1['id'])
+        await client.add_reaction(
             resource_type=2,  # 2=comment
             resource_id=comment1['id'],
             reactor_id=200,
             reaction_type=1  # 1=like
         )
     
-    print("\n" + "=" * 70)
-    print("✅ 测试完成！")
-    print("=" * 70)
-    
-    # 返回数据结构示例
-    print("\n📊 数据结构说明：")
-    print("""
-    返回的评论树结构：
-    [
-        {
-            "id": 1,                    # 一级评论ID
-            "post_id": 1,               # 帖子ID
-            "author_id": 100,           # 作者ID
-            "content": "评论内容",       # 评论内容
-            "at_user_id": null,         # @的用户ID（一级评论通常为null）
-            "created_at": "2024-...",   # 创建时间
-            "replies": [                # 二级回复列表
-                {
-                    "id": 2,            # 回复ID
-                    "author_id": 102,   # 回复者ID
-                    "content": "回复内容",
-                    "at_user_id": 100,  # @的用户ID
-                    "created_at": "2024-..."
-                }
-            ]
-        }
-    ]
-    
-    特点：
-    - 最多支持二层结构（一级评论 + 二级回复）
-    - 二级回复可以 @任何用户（通常是一级评论作者或帖子作者）
-    - 按创建时间升序排列
-    - 支持幂等性（相同的 idempotency_key 不会重复创建）
-    """)
+    logger.debug("✅ 测试完成！")
+
+
+@pytest.mark.asyncio
+async def test_comments(async_client: AsyncRustChatClient, seeded_posts: dict):
+    """测试评论功能"""
+    await _run_comments_test(async_client, seeded_posts["comments"])
 
 
 if __name__ == "__main__":
-    test_comments()
+    sys.exit(pytest.main([__file__, "-s"]))
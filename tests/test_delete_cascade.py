@@ -7,209 +7,144 @@
 4. 重复删除返回 410 Gone
 """
 
-from python_client_example import RustChatClient
-import time
-
-def test_delete_cascade():
-    """测试删除级联逻辑"""
-    print("=" * 70)
-    print("删除级联逻辑测试")
-    print("=" * 70)
-    
-    client = RustChatClient(
-        base_url="http://127.0.0.1:8081",
-        auth_secret="sso-secret"
-    )
-    
-    post_id = 999  # 使用一个测试帖子ID
-    
-    print(f"\n📝 测试帖子 ID: {post_id}")
-    print("-" * 70)
-    
-    # ==================== 场景 1: 创建评论树 ====================
-    print("\n【场景 1】创建评论树")
-    print("-" * 70)
-    
-    print("\n1. 创建一级评论 A（作者=100）")
-    comment_a = client.create_comment(
-        post_id=post_id,
-        author_id=100,
-        content="一级评论 A"
-    )
-    time.sleep(0.3)
-    
-    print("\n2. 创建一级评论 B（作者=101）")
-    comment_b = client.create_comment(
-        post_id=post_id,
-        author_id=101,
-        content="一级评论 B"
-    )
-    time.sleep(0.3)
-    
-    if comment_a:
-        print(f"\n3. 给一级评论 A (ID={comment_a['id']}) 添加回复 A1")
-        reply_a1 = client.create_comment(
-            post_id=post_id,
-            author_id=102,
-            content="回复 A1",
-            parent_comment_id=comment_a['id'],
-            at_user_id=100
-        )
-        time.sleep(0.3)
-        
-        print(f"\n4. 给一级评论 A (ID={comment_a['id']}) 添加回复 A2")
-        reply_a2 = client.create_comment(
-            post_id=post_id,
-            author_id=103,
-            content="回复 A2",
-            parent_comment_id=comment_a['id'],
-            at_user_id=100
-        )
-        time.sleep(0.3)
-    
-    if comment_b:
-        print(f"\n5. 给一级评论 B (ID={comment_b['id']}) 添加回复 B1")
-        reply_b1 = client.create_comment(
-            post_id=post_id,
-            author_id=104,
-            content="回复 B1",
-            parent_comment_id=comment_b['id'],
-            at_user_id=101
-        )
-        time.sleep(0.3)
-    
-    print("\n6. 查看当前评论树")
-    comments = client.get_comments(post_id)
-    print(f"   当前有 {len(comments)} 条一级评论")
-    for c in comments:
-        print(f"   - 一级评论 ID={c['id']}, 回复数={len(c.get('replies', []))}")
-    
-    # ==================== 场景 2: 删除一级评论（级联删除回复）====================
-    print("\n\n【场景 2】删除一级评论 A（应该级联删除其下的所有回复）")
-    print("-" * 70)
-    
-    if comment_a:
-        print(f"\n1. 删除一级评论 A (ID={comment_a['id']})")
-        success = client.delete_comment(comment_a['id'])
-        time.sleep(0.3)
-        
-        if success:
-            print(f"\n2. 尝试回复已删除的一级评论 A (ID={comment_a['id']})")
-            print("   预期：返回 410 Gone，提示评论已删除")
-            failed_reply = client.create_comment(
-                post_id=post_id,
-                author_id=105,
-                content="尝试回复已删除的评论",
-                parent_comment_id=comment_a['id']
-            )
-            if not failed_reply:
-                print("   ✓ 正确：无法回复已删除的评论")
-            time.sleep(0.3)
-            
-            print(f"\n3. 尝试再次删除一级评论 A (ID={comment_a['id']})")
-            print("   预期：返回 410 Gone，提示评论已删除")
-            client.delete_comment(comment_a['id'])
-            time.sleep(0.3)
-    
-    print("\n4. 查看删除后的评论树")
-    comments = client.get_comments(post_id)
-    print(f"   当前有 {len(comments)} 条一级评论（应该只剩下评论 B）")
-    for c in comments:
-        print(f"   - 一级评论 ID={c['id']}, 回复数={len(c.get('replies', []))}")
-    
-    # ==================== 场景 3: 删除帖子（级联删除所有评论）====================
-    print("\n\n【场景 3】删除帖子（应该级联删除所有评论和回复）")
-    print("-" * 70)
-    
-    print(f"\n1. 删除帖子 (ID={post_id})")
-    success = client.delete_post(post_id)
-    time.sleep(0.3)
-    
-    if success:
-        print(f"\n2. 尝试给已删除的帖子添加评论")
-        print("   预期：返回 410 Gone，提示帖子已删除")
-        failed_comment = client.create_comment(
-            post_id=post_id,
-            author_id=106,
-            content="尝试评论已删除的帖子"
-        )
-        if not failed_comment:
-            print("   ✓ 正确：无法评论已删除的帖子")
-        time.sleep(0.3)
-        
-        print(f"\n3. 尝试再次删除帖子 (ID={post_id})")
-        print("   预期：返回 410 Gone，提示帖子已删除")
-        client.delete_post(post_id)
-        time.sleep(0.3)
-        
-        print(f"\n4. 尝试获取已删除帖子的评论列表")
-        comments = client.get_comments(post_id)
-        print(f"   返回 {len(comments)} 条评论（已删除的评论不会显示）")
-    
-    # ==================== 场景 4: 测试二级回复的删除 ====================
-    print("\n\n【场景 4】测试二级回复的删除（不影响一级评论）")
-    print("-" * 70)
-    
-    post_id_2 = 1000  # 使用另一个测试帖子
-    
-    print(f"\n1. 创建新帖子的评论树 (帖子ID={post_id_2})")
-    comment_c = client.create_comment(
-        post_id=post_id_2,
-        author_id=200,
-        content="一级评论 C"
-    )
-    time.sleep(0.3)
-    
-    if comment_c:
-        print(f"\n2. 添加回复 C1")
-        reply_c1 = client.create_comment(
-            post_id=post_id_2,
-            author_id=201,
-            content="回复 C1",
-            parent_comment_id=comment_c['id']
-        )
-        time.sleep(0.3)
-        
-        print(f"\n3. 添加回复 C2")
-        reply_c2 = client.create_comment(
-            post_id=post_id_2,
-            author_id=202,
-            content="回复 C2",
-            parent_comment_id=comment_c['id']
-        )
-        time.sleep(0.3)
-        
-        print("\n4. 查看评论树")
-        comments = client.get_comments(post_id_2)
-        for c in comments:
-            print(f"   - 一级评论 ID={c['id']}, 回复数={len(c.get('replies', []))}")
-        
-        if reply_c1:
-            print(f"\n5. 删除回复 C1 (ID={reply_c1['id']})")
-            client.delete_comment(reply_c1['id'])
-            time.sleep(0.3)
-            
-            print("\n6. 查看删除后的评论树（一级评论应该还在，只是少了一个回复）")
-            comments = client.get_comments(post_id_2)
-            for c in comments:
-                print(f"   - 一级评论 ID={c['id']}, 回复数={len(c.get('replies', []))} (应该是1)")
-                for r in c.get('replies', []):
-                    print(f"     └─ 回复 ID={r['id']}")
-    
-    print("\n" + "=" * 70)
-    print("✅ 删除级联逻辑测试完成！")
-    print("=" * 70)
-    
-    print("\n📊 测试总结：")
-    print("""
+import logging
+import sys
+
+import pytest
+
+from helpers import RustChatClient, wait_until
+
+logger = logging.getLogger(__name__)
+
+
+# 测试总结（pytest -v 时由 conftest 在终端汇总区输出）
+SUMMARY = """
     ✓ 删除一级评论时，其下的所有二级回复都被级联删除
     ✓ 删除帖子时，所有评论和回复都被级联删除
     ✓ 删除二级回复时，不影响一级评论
     ✓ 删除后不能再评论或回复（返回 410 Gone）
     ✓ 重复删除返回 410 Gone
     ✓ 所有删除都是软删除，数据仍在数据库中
-    """)
+    """
+
+
+def _comment_ids(client: RustChatClient, post_id: int, fresh: bool = False) -> set:
+    """评论树中所有一级评论和回复的 ID；轮询时传 fresh=True，每次都读服务端最新状态"""
+    ids = set()
+    for c in client.get_comments(post_id, fresh=fresh):
+        ids.add(c['id'])
+        ids.update(r['id'] for r in c.get('replies', []))
+    return ids
+
+
+def _create_tree(client: RustChatClient, post_id: int) -> list:
+    """一次请求创建整棵评论树：一级评论 A、B 及回复 A1、A2、B1，按此顺序返回"""
+    created = client.create_comments_bulk([
+        {"post_id": post_id, "author_id": 100, "content": "一级评论 A"},
+        {"post_id": post_id, "author_id": 101, "content": "一级评论 B"},
+        {"post_id": post_id, "author_id": 102, "content": "回复 A1", "parent_index": 0, "at_user_id": 100},
+        {"post_id": post_id, "author_id": 103, "content": "回复 A2", "parent_index": 0, "at_user_id": 100},
+        {"post_id": post_id, "author_id": 104, "content": "回复 B1", "parent_index": 1, "at_user_id": 101},
+    ])
+    assert len(created) == 5, "整棵评论树应一次创建成功"
+    return created
+
+
+def test_create_comment_tree(client: RustChatClient, fresh_post: int):
+    """场景 1: 创建评论树"""
+    created = _create_tree(client, fresh_post)
+    # 整棵树在同一事务内提交，一次校验即可
+    assert {c['id'] for c in created} == _comment_ids(client, fresh_post)
+    
+    summary = client.get_comments_summary(fresh_post)
+    logger.debug("   当前有 %s 条一级评论", len(summary))
+    for c in summary:
+        logger.debug("   - 一级评论 ID=%s, 回复数=%s", c['id'], c['reply_count'])
+    assert sorted(c['reply_count'] for c in summary) == [1, 2]
+
+
+def test_delete_top_level_comment_cascades(client: RustChatClient, fresh_post: int):
+    """场景 2: 删除一级评论 A（应该级联删除其下的所有回复）"""
+    post_id = fresh_post
+    created = _create_tree(client, post_id)
+    comment_a = created[0]
+    
+    logger.debug("1. 删除一级评论 A (ID=%s)", comment_a['id'])
+    assert client.delete_comment(comment_a['id'])
+    cascaded = {created[i]['id'] for i in (0, 2, 3)}  # A、A1、A2
+    assert wait_until(lambda: not cascaded & _comment_ids(client, post_id, fresh=True)), "评论 A 及其回复应被级联删除"
+    
+    logger.debug("2. 尝试回复已删除的一级评论 A (ID=%s)", comment_a['id'])
+    logger.debug("   预期：返回 410 Gone，提示评论已删除")
+    failed_reply = client.create_comment(
+        post_id=post_id,
+        author_id=105,
+        content="尝试回复已删除的评论",
+        parent_comment_id=comment_a['id']
+    )
+    assert not failed_reply, "不能回复已删除的评论"
+    logger.debug("   ✓ 正确：无法回复已删除的评论")
+    
+    logger.debug("3. 尝试再次删除一级评论 A (ID=%s)", comment_a['id'])
+    logger.debug("   预期：返回 410 Gone，提示评论已删除")
+    assert not client.delete_comment(comment_a['id'])
+    
+    logger.debug("4. 查看删除后的评论树")
+    summary = client.get_comments_summary(post_id)
+    logger.debug("   当前有 %s 条一级评论（应该只剩下评论 B）", len(summary))
+    for c in summary:
+        logger.debug("   - 一级评论 ID=%s, 回复数=%s", c['id'], c['reply_count'])
+    assert [(c['id'], c['reply_count']) for c in summary] == [(created[1]['id'], 1)]
+
+
+def test_delete_post_cascades(client: RustChatClient, fresh_post: int):
+    """场景 3: 删除帖子（应该级联删除所有评论和回复）"""
+    post_id = fresh_post
+    _create_tree(client, post_id)
+    
+    logger.debug("1. 删除帖子 (ID=%s)", post_id)
+    assert client.delete_post(post_id)
+    assert wait_until(lambda: client.check_post_status(post_id).get('deleted'))
+    
+    logger.debug("2. 尝试给已删除的帖子添加评论")
+    logger.debug("   预期：返回 410 Gone，提示帖子已删除")
+    failed_comment = client.create_comment(
+        post_id=post_id,
+        author_id=106,
+        content="尝试评论已删除的帖子"
+    )
+    assert not failed_comment, "不能评论已删除的帖子"
+    logger.debug("   ✓ 正确：无法评论已删除的帖子")
+    
+    logger.debug("3. 尝试再次删除帖子 (ID=%s)", post_id)
+    logger.debug("   预期：返回 410 Gone，提示帖子已删除")
+    assert not client.delete_post(post_id)
+    
+    logger.debug("4. 尝试获取已删除帖子的评论列表")
+    assert client.get_comments(post_id) == [], "已删除帖子的评论不应显示"
+
+
+def test_delete_reply_keeps_parent(client: RustChatClient, fresh_post: int):
+    """场景 4: 测试二级回复的删除（不影响一级评论）"""
+    post_id = fresh_post
+    
+    logger.debug("1. 创建评论树 (帖子ID=%s)：一级评论 C 及回复 C1、C2", post_id)
+    comment_c, reply_c1, reply_c2 = client.create_comments_bulk([
+        {"post_id": post_id, "author_id": 200, "content": "一级评论 C"},
+        {"post_id": post_id, "author_id": 201, "content": "回复 C1", "parent_index": 0},
+        {"post_id": post_id, "author_id": 202, "content": "回复 C2", "parent_index": 0},
+    ])
+    
+    logger.debug("2. 删除回复 C1 (ID=%s)", reply_c1['id'])
+    assert client.delete_comment(reply_c1['id'])
+    assert wait_until(lambda: reply_c1['id'] not in _comment_ids(client, post_id, fresh=True))
+    
+    logger.debug("3. 查看删除后的评论树（一级评论应该还在，只是少了一个回复）")
+    remaining = _comment_ids(client, post_id)
+    assert comment_c['id'] in remaining, "删除二级回复不应影响一级评论"
+    assert reply_c2['id'] in remaining, "删除二级回复不应影响其他回复"
+    assert [c['reply_count'] for c in client.get_comments_summary(post_id)] == [1]
 
 
 if __name__ == "__main__":
-    test_delete_cascade()
+    sys.exit(pytest.main([__file__, "-s"]))
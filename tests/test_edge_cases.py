@@ -7,248 +7,189 @@
 4. 并发冲突处理
 """
 
-from python_client_example import RustChatClient
-import time
-
-def test_edge_cases():
-    """测试边界情况"""
-    print("=" * 70)
-    print("边界情况测试")
-    print("=" * 70)
-    
-    client = RustChatClient(
-        base_url="http://127.0.0.1:8081",
-        auth_secret="sso-secret"
-    )
-    
-    post_id = 2000  # 使用一个测试帖子ID
-    
-    # ==================== 测试 1: 评论列表按最新时间排序 ====================
-    print("\n【测试 1】评论列表按最新时间排序（最新的在前面）")
-    print("-" * 70)
-    
-    print("\n1. 创建第一条评论（时间：T1）")
-    comment1 = client.create_comment(
-        post_id=post_id,
-        author_id=1001,
-        content="第一条评论 - 时间最早"
-    )
-    time.sleep(1)
-    
-    print("\n2. 创建第二条评论（时间：T2）")
-    comment2 = client.create_comment(
-        post_id=post_id,
-        author_id=1002,
-        content="第二条评论 - 时间居中"
-    )
-    time.sleep(1)
-    
-    print("\n3. 创建第三条评论（时间：T3）")
-    comment3 = client.create_comment(
-        post_id=post_id,
-        author_id=1003,
-        content="第三条评论 - 时间最新"
-    )
-    time.sleep(0.5)
-    
-    print("\n4. 获取评论列表，验证排序")
+import asyncio
+import logging
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pytest
+
+from helpers import AsyncRustChatClient, RustChatClient, build_comment_batch
+
+logger = logging.getLogger(__name__)
+
+
+# 测试总结（pytest -v 时由 conftest 在终端汇总区输出）
+SUMMARY = """
+    ✓ 评论列表按最新时间降序排列（最新的在前面）
+    ✓ 二级回复也按最新时间降序排列
+    ✓ 不能收藏自己发布的帖子/评论（返回 422）
+    ✓ 可以点赞自己的内容
+    ✓ 其他用户可以收藏
+    ✓ 连续评论最少间隔3秒（返回 429）
+    ✓ 不能对已删除的内容添加反应（返回 410）
+    """
+
+
+def _newest_first_ids(items: list) -> list:
+    """按服务端的排序键（created_at 降序，同一时间 id 降序）排出的 ID 列表"""
+    ordered = sorted(items, key=lambda i: (datetime.fromisoformat(i['created_at']), i['id']), reverse=True)
+    return [i['id'] for i in ordered]
+
+
+def test_comments_newest_first(client: RustChatClient, fresh_post: int):
+    """测试 1: 评论列表按最新时间排序（最新的在前面）"""
+    post_id = fresh_post
+    
+    # 三条评论互不依赖，并发发出；排序只以服务端返回的 created_at 为准，不依赖客户端 sleep 拉开时间
+    logger.debug("1. 并发创建三条一级评论（作者ID=1001 / 1002 / 1003）")
+    items = [
+        (1001, "第一条评论"),
+        (1002, "第二条评论"),
+        (1003, "第三条评论"),
+    ]
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futs = [
+            pool.submit(client.create_comment, post_id=post_id, author_id=aid, content=txt)
+            for aid, txt in items
+        ]
+        created = [f.result() for f in futs]
+    
+    logger.debug("2. 获取评论列表，验证排序")
+    assert all(created), "三条评论都应创建成功"
     comments = client.get_comments(post_id)
-    if comments:
-        print(f"\n   评论顺序（应该是最新的在前面）：")
-        for i, c in enumerate(comments, 1):
-            print(f"   [{i}] ID={c['id']}, 内容: {c['content']}")
-            print(f"       时间: {c['created_at']}")
-        
-        if len(comments) >= 3:
-            # 验证第一条是最新的
-            if "最新" in comments[0]['content']:
-                print("\n   ✓ 排序正确：最新的评论在最前面")
-            else:
-                print("\n   ✗ 排序错误：最新的评论不在最前面")
-    
-    # ==================== 测试 2: 不能收藏自己发布的内容 ====================
-    print("\n\n【测试 2】不能收藏自己发布的内容")
-    print("-" * 70)
-    
-    if comment1:
-        print(f"\n1. 尝试收藏自己的评论（作者ID=1001，评论ID={comment1['id']}）")
-        print("   预期：返回 422，提示不能收藏自己发布的内容")
-        success = client.add_reaction(
-            resource_type=2,  # 2=comment
-            resource_id=comment1['id'],
-            reactor_id=1001,  # 与作者ID相同
-            reaction_type=2  # 2=favorite
-        )
-        if not success:
-            print("   ✓ 正确：不能收藏自己的评论")
-        else:
-            print("   ✗ 错误：应该禁止收藏自己的评论")
-        time.sleep(0.5)
-        
-        print(f"\n2. 其他用户收藏该评论（用户ID=1002，评论ID={comment1['id']}）")
-        print("   预期：成功")
-        success = client.add_reaction(
-            resource_type=2,
-            resource_id=comment1['id'],
-            reactor_id=1002,  # 不同的用户
-            reaction_type=2
-        )
-        if success:
-            print("   ✓ 正确：其他用户可以收藏")
-        else:
-            print("   ✗ 错误：其他用户应该可以收藏")
-        time.sleep(0.5)
-        
-        print(f"\n3. 点赞自己的评论（作者ID=1001，评论ID={comment1['id']}）")
-        print("   预期：成功（点赞不受限制）")
-        success = client.add_reaction(
-            resource_type=2,
-            resource_id=comment1['id'],
-            reactor_id=1001,  # 与作者ID相同
-            reaction_type=1  # 1=like
-        )
-        if success:
-            print("   ✓ 正确：可以点赞自己的评论")
-        else:
-            print("   ✗ 错误：应该可以点赞自己的评论")
-    
-    # ==================== 测试 3: 连续评论间隔限制 ====================
-    print("\n\n【测试 3】连续评论间隔限制（最少3秒）")
-    print("-" * 70)
+    logger.debug("   评论顺序（应该是最新的在前面）：")
+    for i, c in enumerate(comments, 1):
+        logger.debug("   [%s] ID=%s, 内容: %s", i, c['id'], c['content'])
+        logger.debug("       时间: %s", c['created_at'])
+    
+    # 帖子是本测试新建的，列表就是刚创建的三条，顺序以服务端返回的 created_at / id 为准
+    listed_ids = [c['id'] for c in comments]
+    assert listed_ids == _newest_first_ids(created), "排序错误：最新的评论不在最前面"
+    logger.debug("   ✓ 排序正确：最新的评论在最前面")
+
+
+@pytest.mark.asyncio
+async def test_cannot_favorite_own_content(async_client: AsyncRustChatClient, fresh_post: int):
+    """测试 2: 不能收藏自己发布的内容"""
+    comment = await async_client.create_comment(post_id=fresh_post, author_id=1001, content="第一条评论")
+    assert comment
+    
+    # 三次反应互不依赖，在同一个异步客户端的连接池上用 asyncio.gather 一次性并发发出
+    logger.debug("1. 尝试收藏自己的评论（作者ID=1001，评论ID=%s）", comment['id'])
+    logger.debug("   预期：返回 422，提示不能收藏自己发布的内容")
+    logger.debug("2. 其他用户收藏该评论（用户ID=1002，评论ID=%s）", comment['id'])
+    logger.debug("   预期：成功")
+    logger.debug("3. 点赞自己的评论（作者ID=1001，评论ID=%s）", comment['id'])
+    logger.debug("   预期：成功（点赞不受限制）")
+    own_favorite, other_favorite, own_like = await asyncio.gather(
+        async_client.add_reaction(2, comment['id'], 1001, 2),  # 2=comment，与作者ID相同，2=favorite
+        async_client.add_reaction(2, comment['id'], 1002, 2),  # 不同的用户
+        async_client.add_reaction(2, comment['id'], 1001, 1),  # 1=like
+    )
+    assert not own_favorite, "应该禁止收藏自己的评论"
+    logger.debug("   ✓ 正确：不能收藏自己的评论")
+    assert other_favorite, "其他用户应该可以收藏"
+    logger.debug("   ✓ 正确：其他用户可以收藏")
+    assert own_like, "应该可以点赞自己的评论"
+    logger.debug("   ✓ 正确：可以点赞自己的评论")
+
+
+def test_comment_interval_limit(client: RustChatClient, fresh_post: int):
+    """测试 3: 连续评论间隔限制（最少3秒）"""
+    post_id = fresh_post
     
-    print("\n1. 创建第一条评论")
+    logger.debug("1. 创建第一条评论")
     first = client.create_comment(
         post_id=post_id,
         author_id=1004,
         content="第一条评论"
     )
     
-    print("\n2. 立即创建第二条评论（间隔 < 3秒）")
-    print("   预期：返回 429，提示请求过于频繁")
+    logger.debug("2. 立即创建第二条评论（间隔 < 3秒）")
+    logger.debug("   预期：返回 429，提示请求过于频繁")
     second = client.create_comment(
         post_id=post_id,
         author_id=1004,  # 同一用户
         content="第二条评论（应该失败）"
     )
-    if not second:
-        print("   ✓ 正确：连续评论被限制")
-    else:
-        print("   ✗ 错误：应该限制连续评论")
-    
-    print("\n3. 等待3秒后再次评论")
-    print("   等待中...", end="", flush=True)
-    for i in range(3):
-        time.sleep(1)
-        print(".", end="", flush=True)
-    print(" 完成")
+    assert first, "第一条评论应该成功"
+    assert not second, "应该限制连续评论"
+    logger.debug("   ✓ 正确：连续评论被限制")
     
+    logger.debug("3. 服务端时钟前移4秒后再次评论（需以 ALLOW_TEST_CLOCK_OFFSET=true 启动服务）")
     third = client.create_comment(
         post_id=post_id,
         author_id=1004,  # 同一用户
-        content="第三条评论（应该成功）"
+        content="第三条评论（应该成功）",
+        headers={"X-Test-Clock-Offset": "4000"}
     )
-    if third:
-        print("   ✓ 正确：间隔3秒后可以评论")
-    else:
-        print("   ✗ 错误：间隔3秒后应该可以评论")
-    
-    # ==================== 测试 4: 二级回复的排序 ====================
-    print("\n\n【测试 4】二级回复也按最新时间排序")
-    print("-" * 70)
-    
-    if comment1:
-        print(f"\n1. 给一级评论添加多个回复")
-        
-        print("   添加回复1（时间：T1）")
-        reply1 = client.create_comment(
-            post_id=post_id,
-            author_id=2001,
-            content="回复1 - 时间最早",
-            parent_comment_id=comment1['id']
-        )
-        time.sleep(1)
-        
-        print("   添加回复2（时间：T2）")
-        reply2 = client.create_comment(
-            post_id=post_id,
-            author_id=2002,
-            content="回复2 - 时间居中",
-            parent_comment_id=comment1['id']
-        )
-        time.sleep(1)
-        
-        print("   添加回复3（时间：T3）")
-        reply3 = client.create_comment(
-            post_id=post_id,
-            author_id=2003,
-            content="回复3 - 时间最新",
-            parent_comment_id=comment1['id']
-        )
-        time.sleep(0.5)
-        
-        print("\n2. 获取评论列表，验证回复排序")
-        comments = client.get_comments(post_id)
-        for c in comments:
-            if c['id'] == comment1['id']:
-                replies = c.get('replies', [])
-                print(f"\n   一级评论 ID={c['id']} 的回复顺序：")
-                for i, r in enumerate(replies, 1):
-                    print(f"   [{i}] ID={r['id']}, 内容: {r['content']}")
-                    print(f"       时间: {r['created_at']}")
-                
-                if len(replies) >= 3:
-                    if "最新" in replies[0]['content']:
-                        print("\n   ✓ 排序正确：最新的回复在最前面")
-                    else:
-                        print("\n   ✗ 排序错误：最新的回复不在最前面")
-                break
-    
-    # ==================== 测试 5: 对已删除内容的操作 ====================
-    print("\n\n【测试 5】对已删除内容的操作限制")
-    print("-" * 70)
-    
-    # 创建一个测试评论
-    print("\n1. 创建一个测试评论")
+    assert third, "间隔3秒后应该可以评论"
+    logger.debug("   ✓ 正确：间隔3秒后可以评论")
+
+
+def test_replies_newest_first(client: RustChatClient, fresh_post: int):
+    """测试 4: 二级回复也按最新时间排序"""
+    logger.debug("1. 一次请求创建一级评论及其多个回复")
+    created = client.create_comments_bulk(
+        [{"post_id": fresh_post, "author_id": 1001, "content": "第一条评论"}]
+        + build_comment_batch(3, fresh_post, base_author=2001, content_prefix="回复", parent_index=0)
+    )
+    assert len(created) == 4
+    
+    # 同一批次的回复 created_at 相同；再单独创建一条，使其时间戳真正晚于批次内的回复
+    logger.debug("2. 单独再创建一条回复")
+    latest = client.create_comment(
+        post_id=fresh_post,
+        author_id=2004,
+        content="最新的回复",
+        parent_comment_id=created[0]['id']
+    )
+    assert latest
+    assert datetime.fromisoformat(latest['created_at']) > datetime.fromisoformat(created[1]['created_at'])
+    
+    logger.debug("3. 获取评论列表，验证回复排序")
+    comments = client.get_comments(fresh_post)
+    assert [c['id'] for c in comments] == [created[0]['id']]
+    replies = comments[0].get('replies', [])
+    logger.debug("   一级评论 ID=%s 的回复顺序：", comments[0]['id'])
+    for i, r in enumerate(replies, 1):
+        logger.debug("   [%s] ID=%s, 内容: %s", i, r['id'], r['content'])
+        logger.debug("       时间: %s", r['created_at'])
+    
+    # 时间更晚的单条回复排在最前，批次内时间相同的回复由 id 降序决定先后
+    reply_ids = [r['id'] for r in replies]
+    assert reply_ids[0] == latest['id'], "排序错误：最新的回复不在最前面"
+    assert reply_ids == _newest_first_ids(created[1:] + [latest]), "排序错误：回复未按时间降序排列"
+    logger.debug("   ✓ 排序正确：最新的回复在最前面")
+
+
+def test_no_reaction_on_deleted_comment(client: RustChatClient, fresh_post: int):
+    """测试 5: 对已删除内容的操作限制"""
+    logger.debug("1. 创建一个测试评论")
     test_comment = client.create_comment(
-        post_id=post_id,
+        post_id=fresh_post,
         author_id=3001,
         content="测试评论（即将被删除）"
     )
-    time.sleep(0.5)
-    
-    if test_comment:
-        print(f"\n2. 删除该评论（ID={test_comment['id']}）")
-        client.delete_comment(test_comment['id'])
-        time.sleep(0.5)
-        
-        print(f"\n3. 尝试收藏已删除的评论")
-        print("   预期：返回 410，提示资源已删除")
-        success = client.add_reaction(
-            resource_type=2,
-            resource_id=test_comment['id'],
-            reactor_id=3002,
-            reaction_type=2
-        )
-        if not success:
-            print("   ✓ 正确：不能对已删除的内容添加反应")
-        else:
-            print("   ✗ 错误：应该禁止对已删除的内容添加反应")
-    
-    print("\n" + "=" * 70)
-    print("✅ 边界情况测试完成！")
-    print("=" * 70)
-    
-    print("\n📊 测试总结：")
-    print("""
-    ✓ 评论列表按最新时间降序排列（最新的在前面）
-    ✓ 二级回复也按最新时间降序排列
-    ✓ 不能收藏自己发布的帖子/评论（返回 422）
-    ✓ 可以点赞自己的内容
-    ✓ 其他用户可以收藏
-    ✓ 连续评论最少间隔3秒（返回 429）
-    ✓ 不能对已删除的内容添加反应（返回 410）
-    """)
+    assert test_comment
+    
+    # 创建 / 删除接口在事务提交后才返回，下一步无需等待
+    logger.debug("2. 删除该评论（ID=%s）", test_comment['id'])
+    assert client.delete_comment(test_comment['id'])
+    
+    logger.debug("3. 尝试收藏已删除的评论")
+    logger.debug("   预期：返回 410，提示资源已删除")
+    success = client.add_reaction(
+        resource_type=2,
+        resource_id=test_comment['id'],
+        reactor_id=3002,
+        reaction_type=2
+    )
+    assert not success, "应该禁止对已删除的内容添加反应"
+    logger.debug("   ✓ 正确：不能对已删除的内容添加反应")
 
 
 if __name__ == "__main__":
-    test_edge_cases()
+    sys.exit(pytest.main([__file__, "-s"]))
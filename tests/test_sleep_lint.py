@@ -0,0 +1,36 @@
+"""
+测试代码中的 sleep 检查
+每个保留下来的 sleep 都必须标注 `# noqa: SLEEP-OK` 并写明原因（例如等待服务端 TTL 到期），
+只为“等一等更保险”而加的 sleep 应改为 wait_until 轮询或直接删除
+"""
+
+import ast
+import os
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+MARKER = "# noqa: SLEEP-OK"
+
+
+def _unmarked_sleeps(path: str) -> list:
+    """返回文件中未标注 SLEEP-OK 的 sleep 调用行号（time.sleep / asyncio.sleep / sleep）"""
+    with open(path, encoding="utf-8") as f:
+        source = f.read()
+    lines = source.splitlines()
+    found = []
+    for node in ast.walk(ast.parse(source, filename=path)):
+        if not isinstance(node, ast.Call):
+            continue
+        func = node.func
+        name = func.attr if isinstance(func, ast.Attribute) else getattr(func, "id", None)
+        if name == "sleep" and MARKER not in lines[node.lineno - 1]:
+            found.append(node.lineno)
+    return found
+
+
+def test_sleeps_are_marked():
+    offenders = [
+        f"{name}:{lineno}"
+        for name in sorted(os.listdir(TESTS_DIR)) if name.endswith(".py")
+        for lineno in _unmarked_sleeps(os.path.join(TESTS_DIR, name))
+    ]
+    assert not offenders, f"sleep 缺少 {MARKER} 标注: {', '.join(offenders)}"